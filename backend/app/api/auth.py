@@ -2,6 +2,8 @@ from fastapi import APIRouter, HTTPException
 from ..models.user import UserCreate, UserLogin, Token
 from ..services.auth_service import auth_service
 from ..services.firebase_service import firebase_service
+from ..services.retranslation_service import retranslation_service
+from ..core.config import settings
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -58,4 +60,41 @@ async def get_user(user_id: str):
         "name": user.get('name'),
         "email": user.get('email'),
         "preferred_language": user.get('preferred_language')
-    }
\ No newline at end of file
+    }
+
+@router.put("/user/{user_id}/language")
+async def update_language(user_id: str, data: dict):
+    """Change a user's preferred language and re-translate their recent history"""
+    language = data.get('language')
+    if not language:
+        raise HTTPException(status_code=400, detail="Language is required")
+    
+    success = await firebase_service.update_user_language(user_id, language)
+    if not success:
+        raise HTTPException(status_code=500, detail="Failed to update language")
+    
+    retranslation = None
+    if settings.RETRANSLATION_ENABLED:
+        retranslation = await retranslation_service.start(user_id, language)
+    
+    return {"status": "success", "preferred_language": language, "retranslation": retranslation}
+
+@router.get("/user/{user_id}/retranslation")
+async def get_retranslation_progress(user_id: str):
+    """Progress of the user's history re-translation job"""
+    progress = await retranslation_service.get_progress(user_id)
+    
+    if not progress:
+        raise HTTPException(status_code=404, detail="No re-translation job")
+    
+    return progress
+
+@router.post("/user/{user_id}/retranslation/resume")
+async def resume_retranslation(user_id: str):
+    """Resume a paused or interrupted re-translation job"""
+    progress = await retranslation_service.resume(user_id)
+    
+    if not progress:
+        raise HTTPException(status_code=404, detail="No re-translation job")
+    
+    return progress
\ No newline at end of file
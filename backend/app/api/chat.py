@@ -1,36 +1,55 @@
 from fastapi import APIRouter, HTTPException
-from typing import List
+from typing import Dict, List, Optional
 from datetime import datetime
+import asyncio
 from ..models.message import Message, MessageCreate, Conversation, ConversationCreate
 from ..services.firebase_service import firebase_service
 from ..services.translation_service import translation_service
 from ..services.sentiment_service import sentiment_service
+from ..services.sentiment_aggregates import sentiment_aggregates
+from ..services.rate_limiter import Priority
+from ..core.config import settings
+from ..core.socket import sio
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
+# Keep references to fire-and-forget tasks so they are not garbage collected
+_background_tasks = set()
+
 @router.post("/conversations", response_model=Conversation)
 async def create_conversation(conv_data: ConversationCreate):
     """Create a new conversation or return existing one"""
     try:
-        convs_ref = firebase_service.db.collection('conversations')
-        
-        query1 = convs_ref.where('participant1_id', '==', conv_data.participant1_id)\
-                         .where('participant2_id', '==', conv_data.participant2_id)\
-                         .limit(1).stream()
+        participant_ids = list(dict.fromkeys(
+            [conv_data.participant1_id, conv_data.participant2_id] + (conv_data.participant_ids or [])
+        ))
         
-        query2 = convs_ref.where('participant1_id', '==', conv_data.participant2_id)\
-                         .where('participant2_id', '==', conv_data.participant1_id)\
-                         .limit(1).stream()
+        # Group conversations are always new; two-person ones are reused
+        if len(participant_ids) > 2:
+            conversation = {
+                'participant1_id': conv_data.participant1_id,
+                'participant2_id': conv_data.participant2_id,
+                'participant_ids': participant_ids,
+                'created_at': datetime.utcnow(),
+                'last_message_at': None
+            }
+            
+            result = await firebase_service.create_conversation(conversation)
+            
+            if not result:
+                raise HTTPException(status_code=500, detail="Failed to create conversation")
+            
+            return result
         
-        for doc in query1:
-            return doc.to_dict()
+        existing = await firebase_service.find_conversation(conv_data.participant1_id, conv_data.participant2_id)
         
-        for doc in query2:
-            return doc.to_dict()
+        if existing:
+            return existing
         
         conversation = {
             'participant1_id': conv_data.participant1_id,
             'participant2_id': conv_data.participant2_id,
+            'participant_ids': participant_ids,
             'created_at': datetime.utcnow(),
             'last_message_at': None
         }
@@ -56,56 +75,233 @@ async def get_conversation(conversation_id: str):
     
     return result
 
+@router.get("/conversations/{conversation_id}/sentiment")
+async def get_conversation_sentiment(conversation_id: str):
+    """Overall and recent mood of a conversation and each participant, from rolling aggregates"""
+    if not await firebase_service.get_conversation(conversation_id):
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    try:
+        return await sentiment_aggregates.get(conversation_id)
+    except Exception as e:
+        print(f"Sentiment aggregate error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/conversations/user/{user_id}")
 async def get_user_conversations(user_id: str):
     """Get all conversations for a user"""
+    return await firebase_service.get_user_conversations(user_id)
+
+def _run_in_background(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+def _participant_ids(conversation: dict) -> List[str]:
+    """Members of a conversation; older two-person documents lack participant_ids"""
+    return conversation.get('participant_ids') or [
+        conversation['participant1_id'], conversation['participant2_id']
+    ]
+
+def _user_room(user_id: str) -> str:
+    return f"user:{user_id}"
+
+async def _recipient_languages(conversation: dict, sender_id: str) -> Dict[str, List[str]]:
+    """Group the recipients of a message by their preferred language"""
+    recipient_ids = [uid for uid in _participant_ids(conversation) if uid != sender_id]
+    # One batched read for all recipients, not one per member
+    recipients = await firebase_service.get_users_by_ids(recipient_ids)
+    
+    groups = {}
+    for user_id in recipient_ids:
+        recipient = recipients.get(user_id)
+        language = recipient.get('preferred_language', 'english') if recipient else 'english'
+        groups.setdefault(translation_service.canonical_language(language), []).append(user_id)
+    return groups
+
+def _audiences(message: dict, target_language: str, groups: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Who gets which variant: each recipient its own language, the sender the primary one"""
+    audiences = {language: list(user_ids) for language, user_ids in groups.items()}
+    audiences.setdefault(translation_service.canonical_language(target_language), []).append(message['sender_id'])
+    return audiences
+
+async def _emit_new_message(message: dict, target_language: str, groups: Dict[str, List[str]]):
+    """
+    Send a saved message to each participant's own room carrying only the
+    variant in that participant's language, never the full translations map
+    """
+    translations = message.get('translations') or {}
+    payload = {key: value for key, value in message.items() if key != 'translations'}
+    payload['timestamp'] = message['timestamp'].isoformat()
+    
+    for language, user_ids in _audiences(message, target_language, groups).items():
+        variant = {**payload, 'translated_text': translations.get(language), 'translated_language': language}
+        await asyncio.gather(*[
+            sio.emit('new_message', variant, room=_user_room(user_id))
+            for user_id in user_ids
+        ])
+
+async def _deliver_translation(message: dict, target_language: str, groups: Dict[str, List[str]]) -> Optional[dict]:
+    """
+    Translate a saved message once per recipient language, patch it, then
+    send each participant only the variant in its own language.
+    Returns the translation result, None on failure.
+    """
     try:
-        convs_ref = firebase_service.db.collection('conversations')
-        
-        query1 = convs_ref.where('participant1_id', '==', user_id).stream()
-        conversations1 = [doc.to_dict() for doc in query1]
-        
-        query2 = convs_ref.where('participant2_id', '==', user_id).stream()
-        conversations2 = [doc.to_dict() for doc in query2]
-        
-        all_conversations = conversations1 + conversations2
+        result = await translation_service.translate_to_languages(
+            message['text'],
+            [target_language, *groups],
+            Priority.LIVE
+        )
+        translations = result['translations']
+        fields = {
+            'language': result['source_language'],
+            'translated_text': translations[translation_service.canonical_language(target_language)],
+            'translated_language': target_language,
+            'translations': translations,
+            'translation_pending': False
+        }
+        await firebase_service.update_message(message['id'], fields)
         
-        return all_conversations
+        for language, user_ids in _audiences(message, target_language, groups).items():
+            variant = {
+                'id': message['id'],
+                'conversation_id': message['conversation_id'],
+                'language': fields['language'],
+                'translated_text': translations[language],
+                'translated_language': language,
+                'translation_pending': False
+            }
+            await asyncio.gather(*[
+                sio.emit('message_translated', variant, room=_user_room(user_id))
+                for user_id in user_ids
+            ])
+        return result
+    except Exception as e:
+        print(f"Error delivering translation: {e}")
+        return None
+
+async def _analyze_message_sentiment(text: str, translation: Optional[dict] = None) -> dict:
+    """Sentiment routed by the message's language, reusing its English translation if any"""
+    if translation is None:
+        translation = {'source_language': await translation_service.detect_language(text), 'translations': {}}
+    return await sentiment_service.analyze_message_async(
+        text,
+        translation_service.get_language_code(translation['source_language']),
+        translation['translations'].get('english')
+    )
+
+async def _deliver_sentiment(message: dict, translation: Optional[dict] = None):
+    """Score a saved message, then patch it and notify the room"""
+    try:
+        sentiment_result = await _analyze_message_sentiment(message['text'], translation)
+        fields = {
+            'sentiment': sentiment_result['sentiment'],
+            'sentiment_emoji': sentiment_result['emoji'],
+            'sentiment_score': sentiment_result['polarity']
+        }
+        await firebase_service.update_message(message['id'], fields)
+        await sentiment_aggregates.record(message['conversation_id'], message['sender_id'], sentiment_result['polarity'])
+        await sio.emit('message_sentiment', {
+            'id': message['id'],
+            'conversation_id': message['conversation_id'],
+            **fields
+        }, room=message['conversation_id'])
     except Exception as e:
-        print(f"Error getting conversations: {e}")
-        return []
+        print(f"Error delivering sentiment: {e}")
+
+async def _deliver_translation_and_sentiment(message: dict, target_language: str, groups: Dict[str, List[str]]):
+    """Sentiment waits for the translations so it can score the English variant"""
+    translation = await _deliver_translation(message, target_language, groups)
+    await _deliver_sentiment(message, translation)
 
 @router.post("/messages")
-async def send_message(message_data: MessageCreate):
-    """Send a message with automatic translation and sentiment analysis"""
+async def send_message(message_data: MessageCreate, progressive: Optional[bool] = None):
+    """
+    Send a message with automatic translation and sentiment analysis.
+    In progressive mode the original is saved and broadcast right away;
+    'message_translated' and 'message_sentiment' events patch it later.
+    """
     try:
+        if progressive is None:
+            progressive = settings.PROGRESSIVE_MESSAGE_DELIVERY
+        
+        # Translate-on-read stores only the original; get_messages localizes it
+        lazy = settings.TRANSLATE_ON_READ
+        
         conversation = await firebase_service.get_conversation(message_data.conversation_id)
         
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        recipient_id = conversation['participant2_id'] if conversation['participant1_id'] == message_data.sender_id else conversation['participant1_id']
+        # One translation per distinct recipient language, not per recipient
+        groups = await _recipient_languages(conversation, message_data.sender_id)
         
-        recipient = await firebase_service.get_user_by_id(recipient_id)
-        target_language = recipient.get('preferred_language', 'english') if recipient else 'english'
+        target_language = next(iter(groups), 'english')
         
         if message_data.translated_language:
             target_language = message_data.translated_language
         
-        translation_result = await translation_service.translate_with_detection(
-            message_data.text,
-            target_language
-        )
+        if progressive:
+            message = {
+                'conversation_id': message_data.conversation_id,
+                'sender_id': message_data.sender_id,
+                'text': message_data.text,
+                'language': message_data.language,
+                'translated_text': None,
+                'translated_language': target_language,
+                'translations': None,
+                'translation_pending': not lazy,
+                'sentiment': None,
+                'sentiment_emoji': None,
+                'sentiment_score': None,
+                'timestamp': datetime.utcnow(),
+                'is_voice': False,
+                'read': False
+            }
+            
+            result = await firebase_service.create_message(message)
+            
+            if not result:
+                raise HTTPException(status_code=500, detail="Failed to send message")
+            
+            await sio.emit('new_message', {
+                **result,
+                'timestamp': result['timestamp'].isoformat()
+            }, room=message_data.conversation_id)
+            
+            if lazy:
+                _run_in_background(_deliver_sentiment(result))
+            else:
+                _run_in_background(_deliver_translation_and_sentiment(result, target_language, groups))
+            _run_in_background(firebase_service.update_conversation_timestamp(message_data.conversation_id))
+            
+            return result
         
-        sentiment_result = sentiment_service.analyze_sentiment(message_data.text)
+        if lazy:
+            translation_result = {
+                'source_language': await translation_service.detect_language(message_data.text),
+                'translations': {}
+            }
+        else:
+            translation_result = await translation_service.translate_to_languages(
+                message_data.text,
+                [target_language, *groups],
+                Priority.LIVE
+            )
+        translations = translation_result['translations']
+        
+        sentiment_result = await _analyze_message_sentiment(message_data.text, translation_result)
         
         message = {
             'conversation_id': message_data.conversation_id,
             'sender_id': message_data.sender_id,
             'text': message_data.text,
             'language': translation_result['source_language'],
-            'translated_text': translation_result['translated_text'],
-            'translated_language': translation_result['target_language'],
+            'translated_text': translations.get(translation_service.canonical_language(target_language)),
+            'translated_language': target_language,
+            'translations': translations,
             'sentiment': sentiment_result['sentiment'],
             'sentiment_emoji': sentiment_result['emoji'],
             'sentiment_score': sentiment_result['polarity'],
@@ -119,6 +315,8 @@ async def send_message(message_data: MessageCreate):
         if not result:
             raise HTTPException(status_code=500, detail="Failed to send message")
         
+        await _emit_new_message(result, target_language, groups)
+        await sentiment_aggregates.record(message_data.conversation_id, message_data.sender_id, sentiment_result['polarity'])
         await firebase_service.update_conversation_timestamp(message_data.conversation_id)
         
         return result
@@ -127,11 +325,70 @@ async def send_message(message_data: MessageCreate):
         print(f"Error sending message: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _localize_messages(messages: List[dict], language: str, viewer_id: str):
+    """
+    Point translated_text at the viewer's language on messages from others.
+    Missing variants are translated in one batch per source language and
+    written back, so each variant is computed once.
+    """
+    language = translation_service.canonical_language(language)
+    
+    missing = {}
+    for message in messages:
+        if message.get('sender_id') == viewer_id:
+            continue
+        
+        variant = (message.get('translations') or {}).get(language)
+        if variant is None and message.get('translated_language') and message.get('translated_text') \
+                and translation_service.canonical_language(message['translated_language']) == language:
+            variant = message['translated_text']
+        if variant is None and translation_service.canonical_language(message.get('language') or '') == language:
+            variant = message['text']
+        
+        if variant is None:
+            missing.setdefault(message.get('language') or 'english', []).append(message)
+            continue
+        message['translated_text'] = variant
+        message['translated_language'] = language
+    
+    sources = list(missing)
+    batches = await asyncio.gather(*[
+        translation_service.translate_batch_results(
+            [message['text'] for message in missing[source]],
+            source,
+            language,
+            Priority.MANUAL
+        )
+        for source in sources
+    ])
+    
+    updates = {}
+    for source, results in zip(sources, batches):
+        for message, result in zip(missing[source], results):
+            message['translated_text'] = result['translated_text']
+            message['translated_language'] = language
+            if result['error']:
+                continue
+            message['translations'] = {**(message.get('translations') or {}), language: result['translated_text']}
+            updates[message['id']] = {f"translations.{language}": result['translated_text']}
+    
+    if updates:
+        _run_in_background(firebase_service.update_messages(updates))
+
 @router.get("/messages/{conversation_id}")
-async def get_messages(conversation_id: str, limit: int = 50):
-    """Get messages for a conversation"""
+async def get_messages(conversation_id: str, limit: int = 50, viewer_id: Optional[str] = None):
+    """
+    Get messages for a conversation. With viewer_id, messages from other
+    participants carry the viewer's current language in translated_text.
+    """
     try:
         messages = await firebase_service.get_messages(conversation_id, limit)
+        
+        if viewer_id:
+            viewer = await firebase_service.get_user_by_id(viewer_id)
+            if viewer:
+                await _localize_messages(messages, viewer.get('preferred_language', 'english'), viewer_id)
+        
         return messages
     except Exception as e:
         print(f"Error getting messages: {e}")
@@ -161,7 +418,7 @@ async def translate_text(data: dict):
             raise HTTPException(status_code=400, detail="Text is required")
         
         if source_lang:
-            translated = await translation_service.translate_text(text, source_lang, target_lang)
+            translated = await translation_service.translate_text(text, source_lang, target_lang, Priority.MANUAL)
             return {
                 'original_text': text,
                 'source_language': source_lang,
@@ -169,7 +426,7 @@ async def translate_text(data: dict):
                 'target_language': target_lang
             }
         else:
-            result = await translation_service.translate_with_detection(text, target_lang)
+            result = await translation_service.translate_with_detection(text, target_lang, Priority.MANUAL)
             return result
             
     except Exception as e:
@@ -184,8 +441,11 @@ async def analyze_sentiment(data: dict):
         if not text:
             raise HTTPException(status_code=400, detail="Text is required")
         
-        result = sentiment_service.analyze_sentiment(text)
-        suggestions = sentiment_service.get_emotion_suggestions(result['sentiment'])
+        result = await sentiment_service.analyze_sentiment_async(text)
+        suggestions = sentiment_service.get_emotion_suggestions(
+            result['sentiment'],
+            data.get('language', 'english')
+        )
         
         return {
             **result,
@@ -195,6 +455,29 @@ async def analyze_sentiment(data: dict):
         print(f"Sentiment analysis error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/analyze-sentiment/batch")
+async def analyze_sentiment_batch(data: dict):
+    """Analyze sentiment of many texts at once, e.g. for history and backfills"""
+    texts = data.get('texts')
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        raise HTTPException(status_code=400, detail="texts must be a list of strings")
+    if len(texts) > settings.SENTIMENT_BATCH_MAX_TEXTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.SENTIMENT_BATCH_MAX_TEXTS} texts per batch"
+        )
+    
+    try:
+        return {'results': await sentiment_service.analyze_batch_async(texts)}
+    except Exception as e:
+        print(f"Batch sentiment analysis error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/translation/stats")
+async def get_translation_stats():
+    """Get translation cache and upstream usage metrics"""
+    return translation_service.get_stats()
+
 @router.get("/languages")
 async def get_supported_languages():
     """Get list of supported languages"""
@@ -18,6 +18,103 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
     
+    # Save and broadcast messages before translation/sentiment finish
+    PROGRESSIVE_MESSAGE_DELIVERY: bool = False
+    
+    # Store only the original and translate history for each viewer on read
+    TRANSLATE_ON_READ: bool = False
+    
+    # Sentiment analysis runs in a pool of spawned worker processes
+    SENTIMENT_PROCESS_POOL: bool = True
+    SENTIMENT_WORKERS: int = 2
+    SENTIMENT_TIMEOUT_SECONDS: float = 2.0
+    SENTIMENT_BATCH_MAX_TEXTS: int = 10000
+    
+    # Rolling per-conversation sentiment, written back in batches
+    SENTIMENT_AGGREGATE_HALF_LIFE_SECONDS: float = 6 * 60 * 60  # recent score decay
+    SENTIMENT_AGGREGATE_FLUSH_SECONDS: float = 5.0
+    SENTIMENT_AGGREGATE_MAX_CONVERSATIONS: int = 10000  # kept in memory
+    
+    # Language detection
+    LANGDETECT_SEED: int = 0
+    LANGDETECT_MEMO_SIZE: int = 10000
+    
+    # Translation cache
+    TRANSLATION_CACHE_SIZE: int = 10000
+    TRANSLATION_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 30  # 30 days
+    TRANSLATION_CACHE_DB_PATH: str = "translation_cache.sqlite3"  # empty disables disk tier
+    TRANSLATION_CACHE_DB_MAX_ENTRIES: int = 500000
+    
+    # Fuzzy translation memory (character trigram Jaccard similarity). Off by
+    # default: a fuzzy hit serves another sentence's translation. At 0.95 about
+    # 0.1% of unseen messages match (benchmarks/translation_memory.py)
+    TRANSLATION_MEMORY_ENABLED: bool = False
+    TRANSLATION_MEMORY_THRESHOLD: float = 0.95
+    TRANSLATION_MEMORY_MAX_ENTRIES: int = 200000
+    
+    # Startup cache warm-up from the most frequent recent messages
+    TRANSLATION_WARMUP_ENABLED: bool = True
+    TRANSLATION_WARMUP_TOP_K: int = 500
+    TRANSLATION_WARMUP_SCAN_LIMIT: int = 5000  # recent messages scanned
+    TRANSLATION_WARMUP_SNAPSHOT_PATH: str = ""  # JSON lines of message documents, used instead of Firestore
+    TRANSLATION_WARMUP_TIMEOUT_SECONDS: float = 20.0
+    TRANSLATION_WARMUP_CONCURRENCY: int = 4
+    
+    # Pivot translation: source -> pivot once (cached), then pivot -> each target.
+    # Comma-separated source-target code pairs, '*' matches any language,
+    # e.g. "ta-hi,ta-bn" or "*-*"; empty disables pivoting
+    TRANSLATION_PIVOT_LANGUAGE: str = "en"
+    TRANSLATION_PIVOT_PAIRS: str = ""
+    
+    # Batch translation
+    TRANSLATION_BATCH_CHAR_LIMIT: int = 4500  # per packed upstream request
+    TRANSLATION_BATCH_CONCURRENCY: int = 4
+    TRANSLATION_CHUNK_RETRIES: int = 1  # extra attempts per chunk before giving up
+    
+    # Translation backends, tried in order: google_http, mymemory_http, deep_translator, offline
+    TRANSLATION_BACKENDS: str = "google_http,mymemory_http,offline"
+    TRANSLATION_BACKEND_TIMEOUT_SECONDS: float = 8.0
+    TRANSLATION_BREAKER_FAILURES: int = 5
+    TRANSLATION_BREAKER_RECOVERY_SECONDS: float = 30.0
+    
+    # Daily request quota per upstream backend (0: no quota and no rate limit).
+    # MyMemory's free tier is 500 requests/day; the Google endpoint has no daily quota
+    MYMEMORY_DAILY_QUOTA: int = 500
+    GOOGLE_TRANSLATE_DAILY_QUOTA: int = 0
+    # Shared daily counts for the workers on one host (empty counts per process;
+    # separate hosts always count separately)
+    TRANSLATION_QUOTA_DB_PATH: str = "translation_quota.sqlite3"
+    # Per-second rate and priority reserves of each backend with a quota
+    TRANSLATION_RATE_PER_SECOND: float = 5.0
+    TRANSLATION_RATE_BURST: int = 10
+    TRANSLATION_QUOTA_RESERVE_MANUAL: float = 0.2  # last 20% kept for live chat
+    TRANSLATION_QUOTA_RESERVE_BACKGROUND: float = 0.5
+    # Adaptive (AIMD) concurrency limit per upstream backend
+    TRANSLATION_AIMD_ENABLED: bool = True
+    TRANSLATION_AIMD_INITIAL_LIMIT: int = 8
+    TRANSLATION_AIMD_MIN_LIMIT: int = 1
+    TRANSLATION_AIMD_MAX_LIMIT: int = 32
+    TRANSLATION_AIMD_LATENCY_TARGET_MS: float = 2000.0  # slower replies count as congestion
+    TRANSLATION_AIMD_BACKOFF: float = 0.5
+    GOOGLE_TRANSLATE_URL: str = "https://translate.googleapis.com"
+    MYMEMORY_URL: str = "https://api.mymemory.translated.net"
+    MYMEMORY_EMAIL: str = ""  # raises the MyMemory daily quota when set
+    # Longest text one request may carry; longer text is split and sent in pieces
+    GOOGLE_TRANSLATE_MAX_CHARS: int = 5000
+    MYMEMORY_MAX_CHARS: int = 160  # 500 bytes of UTF-8, Indic letters take 3
+    TRANSLATION_SPLIT_CONCURRENCY: int = 4  # pieces of one long text in flight at once
+    TRANSLATION_HTTP_MAX_CONNECTIONS: int = 20
+    TRANSLATION_HTTP_MAX_KEEPALIVE: int = 10
+    TRANSLATION_HTTP_KEEPALIVE_SECONDS: float = 30.0
+    TRANSLATION_HTTP_TIMEOUT_SECONDS: float = 10.0
+    
+    # Background re-translation after a preferred language change
+    RETRANSLATION_ENABLED: bool = True
+    RETRANSLATION_MAX_CONVERSATIONS: int = 20  # most recent conversations only
+    RETRANSLATION_MAX_MESSAGES: int = 500  # per conversation, newest first
+    RETRANSLATION_PAGE_SIZE: int = 100
+    RETRANSLATION_USER_CONCURRENCY: int = 2  # conversations in flight per user
+    
     class Config:
         env_file = "../.env"
 
@@ -0,0 +1,9 @@
+import socketio
+
+# Shared Socket.IO server so API routes can push events to conversation rooms
+sio = socketio.AsyncServer(
+    async_mode='asgi',
+    cors_allowed_origins='*',
+    logger=True,
+    engineio_logger=True
+)
@@ -1,7 +1,14 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import socketio
 from .api import auth, chat
+from .core.socket import sio
+from .services.translation_service import translation_service
+from .services.retranslation_service import retranslation_service
+from .services.cache_warmup import cache_warmup
+from .services.sentiment_service import sentiment_service
+from .services.sentiment_aggregates import sentiment_aggregates
+from .core.config import settings
 
 # Create FastAPI app
 app = FastAPI(
@@ -10,14 +17,6 @@ app = FastAPI(
     description="Real-time translation with sentiment analysis"
 )
 
-# Create Socket.IO server with proper CORS
-sio = socketio.AsyncServer(
-    async_mode='asgi',
-    cors_allowed_origins='*',
-    logger=True,
-    engineio_logger=True
-)
-
 # Wrap with Socket.IO
 socket_app = socketio.ASGIApp(sio, app)
 
@@ -37,6 +36,26 @@ app.include_router(chat.router)
 # Track online users
 online_users = {}
 
+@app.on_event("startup")
+async def startup():
+    await sentiment_service.warm_up()
+    sentiment_aggregates.start()
+    
+    # Serving starts only after the cache is warm (bounded by its time budget)
+    if settings.TRANSLATION_WARMUP_ENABLED:
+        await cache_warmup.run()
+    else:
+        cache_warmup.ready = True
+    
+    if settings.RETRANSLATION_ENABLED:
+        await retranslation_service.resume_unfinished()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await translation_service.close()
+    sentiment_service.close()
+    await sentiment_aggregates.close()
+
 @app.get("/")
 async def root():
     return {
@@ -55,7 +74,14 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "online_users": len(online_users)}
+    return {"status": "healthy", "online_users": len(online_users), "ready": cache_warmup.ready}
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until the translation cache warm-up has finished"""
+    if not cache_warmup.ready:
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {"status": "ready", "warmup": cache_warmup.get_stats()}
 
 # Socket.IO events
 @sio.event
@@ -76,6 +102,8 @@ async def user_online(sid, data):
     """Track user online status"""
     user_id = data.get('user_id')
     online_users[sid] = user_id
+    # Per-user room for deliveries only this user should get
+    await sio.enter_room(sid, f"user:{user_id}")
     print(f"👤 User {user_id} is online (sid: {sid})")
     await sio.emit('user_online', {'user_id': user_id})
 
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class MessageBase(BaseModel):
@@ -7,6 +7,8 @@ class MessageBase(BaseModel):
     language: str
     translated_text: Optional[str] = None
     translated_language: Optional[str] = None
+    # Every recipient language -> translated text, for group conversations
+    translations: Optional[Dict[str, str]] = None
 
 class MessageCreate(MessageBase):
     conversation_id: str
@@ -23,10 +25,13 @@ class Message(MessageBase):
 class ConversationCreate(BaseModel):
     participant1_id: str
     participant2_id: str
+    # Full member list for group conversations (defaults to the two participants)
+    participant_ids: Optional[List[str]] = None
 
 class Conversation(BaseModel):
     id: str
     participant1_id: str
     participant2_id: str
+    participant_ids: Optional[List[str]] = None
     created_at: datetime
     last_message_at: Optional[datetime] = None
\ No newline at end of file
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from ..core.config import settings
+from .firebase_service import firebase_service
+from .translation_service import translation_service
+from .translation_cache import normalize_text
+from .text_processing import mask_protected, split_long
+from .rate_limiter import Priority
+
+class CacheWarmup:
+    """
+    Preloads the translation cache at startup with the most frequent
+    (text, language pair) entries among recent messages, read from
+    Firestore or a snapshot file. Translations already stored on the
+    messages are loaded directly; only the rest go upstream, at BACKGROUND
+    priority with bounded concurrency and a time budget.
+    """
+    def __init__(self, top_k: int = 500, scan_limit: int = 5000, snapshot_path: str = "",
+                 timeout: float = 20.0, concurrency: int = 4):
+        self.top_k = top_k
+        self.scan_limit = scan_limit
+        self.snapshot_path = snapshot_path
+        self.timeout = timeout
+        self.concurrency = concurrency
+
+        self.ready = False
+        self.stats = {
+            'source': None,
+            'scanned': 0,
+            'candidates': 0,
+            'already_cached': 0,
+            'seeded': 0,
+            'rejected': 0,
+            'translated': 0,
+            'failed': 0,
+            'timed_out': 0,
+            'duration_ms': 0.0
+        }
+
+    async def _load_messages(self) -> List[Dict]:
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            self.stats['source'] = self.snapshot_path
+            messages = []
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        messages.append(json.loads(line))
+                    if len(messages) >= self.scan_limit:
+                        break
+            return messages
+
+        self.stats['source'] = 'firestore'
+        return await firebase_service.get_recent_messages(self.scan_limit)
+
+    def _pairs(self, message: Dict) -> Iterable[Tuple[str, str, Optional[str]]]:
+        """(source, target, stored translation) for every variant a message was shown in"""
+        source = translation_service.get_language_code(message.get('language') or '')
+        translations = dict(message.get('translations') or {})
+        if message.get('translated_language'):
+            translations.setdefault(message['translated_language'], message.get('translated_text'))
+
+        # Messages whose detection failed carry 'unknown' as their language
+        if not translation_service.is_supported(source):
+            return
+        for language, translated in translations.items():
+            target = translation_service.get_language_code(language)
+            if translation_service.is_supported(target) and source != target:
+                yield source, target, translated
+
+    def _rank(self, messages: List[Dict]) -> List[Tuple[str, str, str, Optional[str]]]:
+        """Top-K (text, source, target, known translation), most frequent first"""
+        counts = Counter()
+        known = {}
+        for message in messages:
+            text = message.get('text')
+            if not text:
+                continue
+            for source, target, translated in self._pairs(message):
+                key = (normalize_text(text), source, target)
+                counts[key] += 1
+                # Failed translations were saved as the original text; never reuse those
+                if translated and normalize_text(translated) == key[0]:
+                    self.stats['rejected'] += 1
+                    continue
+                # Messages are newest first, so the first translation seen is the latest
+                if translated and key not in known:
+                    known[key] = translated
+
+        return [(text, source, target, known.get((text, source, target)))
+                for (text, source, target), _ in counts.most_common(self.top_k)]
+
+    async def _warm(self, text: str, source: str, target: str, known: Optional[str]):
+        # A stored translation matches the cache key only for single-segment,
+        # unmasked text; everything else goes through the full pipeline
+        masked, spans = mask_protected(text)
+        segments, _ = split_long(masked, settings.TRANSLATION_BATCH_CHAR_LIMIT)
+        simple = not spans and len(segments) == 1
+
+        if simple and await translation_service.cache.get(text, source, target) is not None:
+            self.stats['already_cached'] += 1
+            return
+        if simple and known and translation_service.seed(text, source, target, known):
+            self.stats['seeded'] += 1
+            return
+
+        results = await translation_service.translate_batch_results([text], source, target, Priority.BACKGROUND)
+        if results[0]['error']:
+            self.stats['failed'] += 1
+        else:
+            self.stats['translated'] += 1
+
+    async def run(self):
+        """Warm the cache within the time budget; the worker is ready afterwards either way"""
+        started = time.perf_counter()
+        try:
+            messages = await self._load_messages()
+            self.stats['scanned'] = len(messages)
+            entries = self._rank(messages)
+            self.stats['candidates'] = len(entries)
+            print(f"Cache warm-up: {len(entries)} entries from {len(messages)} messages ({self.stats['source']})")
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            step = max(len(entries) // 10, 1)
+            done = 0
+
+            async def warm(entry):
+                nonlocal done
+                async with semaphore:
+                    try:
+                        await self._warm(*entry)
+                    except Exception as e:
+                        self.stats['failed'] += 1
+                        print(f"Cache warm-up error: {e}")
+                done += 1
+                if done % step == 0:
+                    print(f"Cache warm-up: {done}/{len(entries)} "
+                          f"(seeded {self.stats['seeded']}, translated {self.stats['translated']})")
+
+            tasks = [asyncio.create_task(warm(entry)) for entry in entries]
+            if tasks:
+                _, pending = await asyncio.wait(tasks, timeout=self.timeout)
+                for task in pending:
+                    task.cancel()
+                self.stats['timed_out'] = len(pending)
+                if pending:
+                    print(f"Cache warm-up: time budget used, {len(pending)} entries skipped")
+        except Exception as e:
+            print(f"Cache warm-up error: {e}")
+        finally:
+            self.stats['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            self.ready = True
+            print(f"Cache warm-up finished in {self.stats['duration_ms']} ms")
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'ready': self.ready}
+
+# Create singleton instance
+cache_warmup = CacheWarmup(
+    top_k=settings.TRANSLATION_WARMUP_TOP_K,
+    scan_limit=settings.TRANSLATION_WARMUP_SCAN_LIMIT,
+    snapshot_path=settings.TRANSLATION_WARMUP_SNAPSHOT_PATH,
+    timeout=settings.TRANSLATION_WARMUP_TIMEOUT_SECONDS,
+    concurrency=settings.TRANSLATION_WARMUP_CONCURRENCY
+)
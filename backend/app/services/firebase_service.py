@@ -1,11 +1,26 @@
 import firebase_admin
-from firebase_admin import credentials, firestore, auth
-from typing import Optional, Dict, Any
+from firebase_admin import credentials, firestore, firestore_async, auth
+from google.cloud.firestore import AsyncClient
+from typing import Optional, Dict, Any, List
 from datetime import datetime
+import asyncio
 import os
 
 class FirebaseService:
-    def __init__(self):
+    """
+    Firestore access on the native async client, so a round trip awaits
+    instead of blocking the event loop (and every Socket.IO connection).
+    """
+    def __init__(self, db: Optional[AsyncClient] = None):
+        if db is not None:
+            self.db = db
+            return
+        
+        # Local Firestore emulator: no service account needed
+        if os.environ.get('FIRESTORE_EMULATOR_HOST'):
+            self.db = AsyncClient(project=os.environ.get('GCLOUD_PROJECT', 'demo-local-language'))
+            return
+        
         # Initialize Firebase Admin
         cred_path = os.path.join(os.path.dirname(__file__), '../../firebase-credentials-local-language.json')
         
@@ -13,14 +28,14 @@ class FirebaseService:
             cred = credentials.Certificate(cred_path)
             firebase_admin.initialize_app(cred)
         
-        self.db = firestore.client()
+        self.db = firestore_async.client()
     
     # User operations
     async def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             user_ref = self.db.collection('users').document()
             user_data['id'] = user_ref.id
-            user_ref.set(user_data)
+            await user_ref.set(user_data)
             return user_data
         except Exception as e:
             print(f"Error creating user: {e}")
@@ -32,7 +47,7 @@ class FirebaseService:
             query = users_ref.where('email', '==', email).limit(1)
             docs = query.stream()
             
-            for doc in docs:
+            async for doc in docs:
                 return doc.to_dict()
             return None
         except Exception as e:
@@ -41,7 +56,7 @@ class FirebaseService:
    
     async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         try:
-            doc = self.db.collection('users').document(user_id).get()
+            doc = await self.db.collection('users').document(user_id).get()
             if doc.exists:
                 return doc.to_dict()
             return None
@@ -49,9 +64,20 @@ class FirebaseService:
             print(f"Error getting user: {e}")
             return None
     
+    async def get_users_by_ids(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch many users in one batched read, keyed by id (missing users are left out)"""
+        if not user_ids:
+            return {}
+        try:
+            refs = [self.db.collection('users').document(user_id) for user_id in user_ids]
+            return {doc.id: doc.to_dict() async for doc in self.db.get_all(refs) if doc.exists}
+        except Exception as e:
+            print(f"Error getting users: {e}")
+            return {}
+    
     async def update_user_language(self, user_id: str, language: str) -> bool:
         try:
-            self.db.collection('users').document(user_id).update({
+            await self.db.collection('users').document(user_id).update({
                 'preferred_language': language
             })
             return True
@@ -64,7 +90,7 @@ class FirebaseService:
         try:
             conv_ref = self.db.collection('conversations').document()
             conversation_data['id'] = conv_ref.id
-            conv_ref.set(conversation_data)
+            await conv_ref.set(conversation_data)
             return conversation_data
         except Exception as e:
             print(f"Error creating conversation: {e}")
@@ -72,7 +98,7 @@ class FirebaseService:
     
     async def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
         try:
-            doc = self.db.collection('conversations').document(conversation_id).get()
+            doc = await self.db.collection('conversations').document(conversation_id).get()
             if doc.exists:
                 return doc.to_dict()
             return None
@@ -80,9 +106,55 @@ class FirebaseService:
             print(f"Error getting conversation: {e}")
             return None
     
+    async def find_conversation(self, participant1_id: str, participant2_id: str) -> Optional[Dict[str, Any]]:
+        """The two-person conversation between these users, in either order"""
+        try:
+            convs_ref = self.db.collection('conversations')
+            queries = [
+                convs_ref.where('participant1_id', '==', first)
+                         .where('participant2_id', '==', second)
+                         .limit(1)
+                for first, second in [(participant1_id, participant2_id), (participant2_id, participant1_id)]
+            ]
+            for docs in await asyncio.gather(*[query.get() for query in queries]):
+                for doc in docs:
+                    return doc.to_dict()
+            return None
+        except Exception as e:
+            print(f"Error finding conversation: {e}")
+            return None
+    
+    async def get_user_conversations(self, user_id: str) -> List[Dict[str, Any]]:
+        """Conversations the user takes part in, most recently active first"""
+        try:
+            convs_ref = self.db.collection('conversations')
+            
+            queries = [
+                convs_ref.where('participant1_id', '==', user_id),
+                convs_ref.where('participant2_id', '==', user_id),
+                # Group members beyond the first two are only listed in participant_ids
+                convs_ref.where('participant_ids', 'array_contains', user_id)
+            ]
+            results = await asyncio.gather(*[query.get() for query in queries])
+            
+            conversations = {}
+            for docs in results:
+                for doc in docs:
+                    conversation = doc.to_dict()
+                    conversations[conversation['id']] = conversation
+            
+            return sorted(
+                conversations.values(),
+                key=lambda c: c.get('last_message_at') or c.get('created_at') or datetime.min,
+                reverse=True
+            )
+        except Exception as e:
+            print(f"Error getting user conversations: {e}")
+            return []
+    
     async def update_conversation_timestamp(self, conversation_id: str) -> bool:
         try:
-            self.db.collection('conversations').document(conversation_id).update({
+            await self.db.collection('conversations').document(conversation_id).update({
                 'last_message_at': datetime.utcnow()
             })
             return True
@@ -95,7 +167,7 @@ class FirebaseService:
         try:
             msg_ref = self.db.collection('messages').document()
             message_data['id'] = msg_ref.id
-            msg_ref.set(message_data)
+            await msg_ref.set(message_data)
             return message_data
         except Exception as e:
             print(f"Error creating message: {e}")
@@ -110,17 +182,142 @@ class FirebaseService:
             docs = query.stream()
             
             messages = []
-            for doc in docs:
+            async for doc in docs:
                 messages.append(doc.to_dict())
             return messages
         except Exception as e:
             print(f"Error getting messages: {e}")
             return []
     
+    async def get_recent_messages(self, limit: int = 5000) -> List[Dict[str, Any]]:
+        """Most recent messages across all conversations"""
+        try:
+            query = self.db.collection('messages')\
+                           .order_by('timestamp', direction=firestore.Query.DESCENDING)\
+                           .limit(limit)
+            return [doc.to_dict() async for doc in query.stream()]
+        except Exception as e:
+            print(f"Error getting recent messages: {e}")
+            return []
+    
+    async def get_message_page(self, conversation_id: str, limit: int = 100,
+                               before: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Messages of a conversation, newest first, older than before"""
+        try:
+            query = self.db.collection('messages')\
+                           .where('conversation_id', '==', conversation_id)\
+                           .order_by('timestamp', direction=firestore.Query.DESCENDING)
+            if before is not None:
+                query = query.start_after({'timestamp': before})
+            return [doc.to_dict() async for doc in query.limit(limit).stream()]
+        except Exception as e:
+            print(f"Error getting message page: {e}")
+            return []
+    
+    async def update_message(self, message_id: str, fields: Dict[str, Any]) -> bool:
+        """Patch fields on an existing message"""
+        try:
+            await self.db.collection('messages').document(message_id).update(fields)
+            return True
+        except Exception as e:
+            print(f"Error updating message: {e}")
+            return False
+    
+    async def update_messages(self, updates: Dict[str, Dict[str, Any]]) -> bool:
+        """Patch many messages with batched writes (Firestore allows 500 per batch)"""
+        try:
+            items = list(updates.items())
+            for start in range(0, len(items), 500):
+                batch = self.db.batch()
+                for message_id, fields in items[start:start + 500]:
+                    batch.update(self.db.collection('messages').document(message_id), fields)
+                await batch.commit()
+            return True
+        except Exception as e:
+            print(f"Error updating messages: {e}")
+            return False
+    
+    # Background job checkpoints
+    async def get_retranslation_job(self, user_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            doc = await self.db.collection('retranslation_jobs').document(user_id).get()
+            if doc.exists:
+                return doc.to_dict()
+            return None
+        except Exception as e:
+            print(f"Error getting retranslation job: {e}")
+            return None
+    
+    async def save_retranslation_job(self, job: Dict[str, Any]) -> bool:
+        try:
+            await self.db.collection('retranslation_jobs').document(job['user_id']).set(job)
+            return True
+        except Exception as e:
+            print(f"Error saving retranslation job: {e}")
+            return False
+    
+    async def get_unfinished_retranslation_jobs(self) -> List[Dict[str, Any]]:
+        try:
+            query = self.db.collection('retranslation_jobs').where('status', '==', 'running')
+            return [doc.to_dict() async for doc in query.stream()]
+        except Exception as e:
+            print(f"Error getting retranslation jobs: {e}")
+            return []
+    
+    # Rolling sentiment aggregates, one document per conversation
+    async def get_sentiment_aggregate(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            doc = await self.db.collection('conversation_sentiment').document(conversation_id).get()
+            if doc.exists:
+                return doc.to_dict()
+            return None
+        except Exception as e:
+            print(f"Error getting sentiment aggregate: {e}")
+            return None
+    
+    async def save_sentiment_aggregates(self, aggregates: Dict[str, Dict[str, Any]]) -> List[str]:
+        """
+        Merge many aggregate updates with batched writes. Each update is
+        {'conversation': fields, 'participants': {user_id: fields}}; the
+        count, sum and sum_sq fields are deltas applied as increments, so
+        concurrent writers add up, and the other fields are set. Returns the
+        ids written; an error stops at the failed batch.
+        """
+        saved = []
+        try:
+            items = list(aggregates.items())
+            for start in range(0, len(items), 500):
+                batch = self.db.batch()
+                chunk = items[start:start + 500]
+                for conversation_id, aggregate in chunk:
+                    batch.set(
+                        self.db.collection('conversation_sentiment').document(conversation_id),
+                        {
+                            'conversation': self._increments(aggregate['conversation']),
+                            'participants': {
+                                user_id: self._increments(fields)
+                                for user_id, fields in aggregate['participants'].items()
+                            }
+                        },
+                        merge=True
+                    )
+                await batch.commit()
+                saved.extend(conversation_id for conversation_id, _ in chunk)
+        except Exception as e:
+            print(f"Error saving sentiment aggregates: {e}")
+        return saved
+    
+    @staticmethod
+    def _increments(fields: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            key: firestore.Increment(value) if key in ('count', 'sum', 'sum_sq') else value
+            for key, value in fields.items()
+        }
+    
     async def mark_message_read(self, message_id: str) -> bool:
         """Mark a message as read"""
         try:
-            self.db.collection('messages').document(message_id).update({
+            await self.db.collection('messages').document(message_id).update({
                 'read': True,
                 'read_at': datetime.utcnow()
             })
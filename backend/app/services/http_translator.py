@@ -0,0 +1,136 @@
+import asyncio
+import time
+from typing import Dict, Optional
+import httpx
+
+class TranslationHTTPError(Exception):
+    """Raised when the upstream translation endpoint returns an unusable reply"""
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class AsyncHTTPTranslator:
+    """
+    Native asyncio translation client for the Google (gtx) and MyMemory
+    endpoints. One shared, bounded keep-alive connection pool is used for
+    every request, so there is no per-message session, TLS handshake or thread.
+    """
+    PROVIDERS = ('google', 'mymemory')
+
+    def __init__(self, provider: str, base_url: str, max_connections: int = 20,
+                 max_keepalive_connections: int = 10, keepalive_expiry: float = 30.0,
+                 timeout: float = 10.0, email: Optional[str] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        if provider not in self.PROVIDERS:
+            raise ValueError(f"Unknown translation provider: {provider}")
+
+        self.provider = provider
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.email = email
+        # Replaces the network transport (and its pool limits), e.g. httpx.MockTransport in tests
+        self.transport = transport
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+
+        self.stats = {
+            'requests': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'in_flight': 0,
+            'peak_in_flight': 0,
+            'total_latency_ms': 0.0
+        }
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared pooled client, created lazily on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=httpx.Timeout(self.timeout),
+                transport=self.transport
+            )
+        return self._client
+
+    async def translate(self, text: str, source_code: str, target_code: str,
+                        timeout: Optional[float] = None) -> str:
+        """Translate text with a per-request timeout; raises on failure"""
+        self.stats['requests'] += 1
+        self.stats['in_flight'] += 1
+        self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.stats['in_flight'])
+        started = time.perf_counter()
+
+        try:
+            request_timeout = httpx.Timeout(timeout) if timeout is not None else httpx.USE_CLIENT_DEFAULT
+            if self.provider == 'google':
+                return await self._translate_google(text, source_code, target_code, request_timeout)
+            return await self._translate_mymemory(text, source_code, target_code, request_timeout)
+        except (httpx.TimeoutException, asyncio.TimeoutError):
+            self.stats['timeouts'] += 1
+            self.stats['errors'] += 1
+            raise
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+        finally:
+            self.stats['in_flight'] -= 1
+            self.stats['total_latency_ms'] += (time.perf_counter() - started) * 1000
+
+    async def _translate_google(self, text: str, source_code: str, target_code: str, timeout) -> str:
+        response = await self.client.get(
+            f"{self.base_url}/translate_a/single",
+            params={'client': 'gtx', 'sl': source_code, 'tl': target_code, 'dt': 't', 'q': text},
+            timeout=timeout
+        )
+        if response.status_code != 200:
+            raise TranslationHTTPError(f"Google translate returned {response.status_code}", response.status_code)
+
+        try:
+            data = response.json()
+            return ''.join(segment[0] for segment in data[0] if segment and segment[0])
+        except (ValueError, TypeError, IndexError, KeyError) as e:
+            raise TranslationHTTPError(f"Unexpected Google translate reply: {e}")
+
+    async def _translate_mymemory(self, text: str, source_code: str, target_code: str, timeout) -> str:
+        params = {'q': text, 'langpair': f"{source_code}|{target_code}"}
+        if self.email:
+            params['de'] = self.email
+
+        response = await self.client.get(f"{self.base_url}/get", params=params, timeout=timeout)
+        if response.status_code != 200:
+            raise TranslationHTTPError(f"MyMemory returned {response.status_code}", response.status_code)
+
+        try:
+            data = response.json()
+            status = int(data.get('responseStatus', 200))
+        except (ValueError, TypeError, AttributeError) as e:
+            raise TranslationHTTPError(f"Unexpected MyMemory reply: {e}")
+        if status != 200:
+            raise TranslationHTTPError(f"MyMemory error: {data.get('responseDetails')}", status)
+
+        translated = (data.get('responseData') or {}).get('translatedText')
+        if not translated:
+            raise TranslationHTTPError("MyMemory returned an empty translation")
+        return translated
+
+    async def aclose(self):
+        """Close the shared connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_stats(self) -> Dict:
+        completed = self.stats['requests'] - self.stats['in_flight']
+        return {
+            **self.stats,
+            'provider': self.provider,
+            'avg_latency_ms': round(self.stats['total_latency_ms'] / completed, 2) if completed else 0.0,
+            'max_connections': self.limits.max_connections,
+            'max_keepalive_connections': self.limits.max_keepalive_connections,
+            'pool_open': self._client is not None and not self._client.is_closed
+        }
@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+from langdetect.detector_factory import DetectorFactory, PROFILES_DIRECTORY
+from langdetect.utils.lang_profile import LangProfile
+from .translation_cache import normalize_text
+
+# Unicode blocks that identify a supported language on their own.
+# Devanagari (hindi/marathi/sanskrit) and Latin are ambiguous and left to langdetect.
+_SCRIPTS = [
+    # (name, first code point, last code point, language or None if ambiguous)
+    ('latin', 0x0041, 0x005A, None),
+    ('latin', 0x0061, 0x007A, None),
+    ('latin', 0x00C0, 0x024F, None),
+    ('arabic', 0x0600, 0x06FF, 'urdu'),
+    ('arabic', 0x0750, 0x077F, 'urdu'),
+    ('arabic', 0xFB50, 0xFDFF, 'urdu'),
+    ('arabic', 0xFE70, 0xFEFF, 'urdu'),
+    ('devanagari', 0x0900, 0x097F, None),
+    ('bengali', 0x0980, 0x09FF, 'bengali'),
+    ('gurmukhi', 0x0A00, 0x0A7F, 'punjabi'),
+    ('gujarati', 0x0A80, 0x0AFF, 'gujarati'),
+    ('oriya', 0x0B00, 0x0B7F, 'odia'),
+    ('tamil', 0x0B80, 0x0BFF, 'tamil'),
+    ('telugu', 0x0C00, 0x0C7F, 'telugu'),
+    ('kannada', 0x0C80, 0x0CFF, 'kannada'),
+    ('malayalam', 0x0D00, 0x0D7F, 'malayalam'),
+    # ৰ and ৱ only occur in Assamese, which otherwise shares the Bengali block
+    ('assamese', 0x09F0, 0x09F1, 'assamese'),
+]
+
+class ScriptDetector:
+    """
+    Vectorized script-histogram language detector. Code points are mapped
+    to script ids through a precomputed table and counted with bincount,
+    so unambiguous scripts resolve in microseconds without an n-gram model.
+    """
+    def __init__(self, min_share: float = 0.6):
+        self.min_share = min_share
+        self.script_names = ['other']
+        self.script_languages = [None]
+
+        self._table = np.zeros(0x10000, dtype=np.uint8)
+        for name, first, last, language in _SCRIPTS:
+            if name not in self.script_names:
+                self.script_names.append(name)
+                self.script_languages.append(language)
+            self._table[first:last + 1] = self.script_names.index(name)
+
+        self._bengali = self.script_names.index('bengali')
+        self._assamese = self.script_names.index('assamese')
+
+    def histogram(self, text: str) -> np.ndarray:
+        """Count letters per script id (index 0 collects everything else)"""
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        codes = codes[codes < 0x10000]
+        return np.bincount(self._table[codes], minlength=len(self.script_names))
+
+    def classify(self, text: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Return (language, dominant script). language is None when the text
+        is ambiguous and needs a statistical detector.
+        """
+        counts = self.histogram(text)
+        # Assamese-only letters also count as Bengali-Assamese script
+        counts[self._bengali] += counts[self._assamese]
+        assamese_marks = counts[self._assamese]
+        counts[self._assamese] = 0
+
+        letters = counts[1:].sum()
+        if letters == 0:
+            return None, None
+
+        dominant = int(counts[1:].argmax()) + 1
+        script = self.script_names[dominant]
+        if counts[dominant] < letters * self.min_share:
+            return None, script
+
+        if dominant == self._bengali and assamese_marks:
+            return 'assamese', script
+        return self.script_languages[dominant], script
+
+    def detect(self, text: str) -> Optional[str]:
+        """Return the language name when the script alone identifies it"""
+        return self.classify(text)[0]
+
+class RestrictedLangDetector:
+    """
+    langdetect engine built once, with only the profiles for our supported
+    languages and a fixed seed, so results are repeatable across workers.
+    Results are memoized by normalized text.
+    """
+    def __init__(self, codes: Iterable[str], seed: int = 0, memo_size: int = 10000):
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memo_hits': 0, 'detections': 0}
+
+        self.factory = DetectorFactory()
+        self.factory.set_seed(seed)
+        available = set(os.listdir(PROFILES_DIRECTORY))
+        profiles = sorted(code for code in set(codes) if code in available)
+        for index, code in enumerate(profiles):
+            with open(os.path.join(PROFILES_DIRECTORY, code), encoding='utf-8') as f:
+                self.factory.add_profile(LangProfile(**json.load(f)), index, len(profiles))
+
+    @property
+    def languages(self):
+        return self.factory.get_lang_list()
+
+    def cached(self, text: str) -> Optional[str]:
+        """Return a memoized result without running the detector"""
+        key = normalize_text(text)
+        with self._lock:
+            code = self._memo.get(key)
+            if code is not None:
+                self._memo.move_to_end(key)
+                self.stats['memo_hits'] += 1
+            return code
+
+    def detect(self, text: str, default_code: str = 'en') -> str:
+        """Detect the language code of text, falling back to default_code"""
+        code = self.cached(text)
+        if code is not None:
+            return code
+
+        try:
+            detector = self.factory.create()
+            detector.append(text)
+            code = detector.detect()
+        except Exception:
+            code = default_code
+        self.stats['detections'] += 1
+
+        with self._lock:
+            self._memo[normalize_text(text)] = code
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return code
+
+    def get_stats(self):
+        return {**self.stats, 'memo_entries': len(self._memo), 'languages': self.languages}
+
+script_detector = ScriptDetector()
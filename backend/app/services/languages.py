@@ -0,0 +1,26 @@
+from typing import Dict
+
+# Supported languages: lowercase display name -> ISO 639-1 code
+LANGUAGE_CODES: Dict[str, str] = {
+    'hindi': 'hi',
+    'tamil': 'ta',
+    'telugu': 'te',
+    'bengali': 'bn',
+    'marathi': 'mr',
+    'gujarati': 'gu',
+    'kannada': 'kn',
+    'malayalam': 'ml',
+    'punjabi': 'pa',
+    'odia': 'or',
+    'english': 'en',
+    'urdu': 'ur',
+    'assamese': 'as',
+    'sanskrit': 'sa'
+}
+
+LANGUAGE_NAMES: Dict[str, str] = {code: name for name, code in LANGUAGE_CODES.items()}
+
+def canonical_language(language: str) -> str:
+    """Normalize a language name or code to its lowercase display name"""
+    language = (language or '').strip().lower()
+    return LANGUAGE_NAMES.get(LANGUAGE_CODES.get(language, language), language)
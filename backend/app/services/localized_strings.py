@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+from typing import Dict, List
+from .languages import LANGUAGE_CODES, canonical_language
+
+# Fixed English strings shown to users, by key
+SOURCE_STRINGS = {
+    'suggestion.positive.0': "That's wonderful! 🎉",
+    'suggestion.positive.1': "I'm so happy for you! 😊",
+    'suggestion.positive.2': "Amazing news! ⭐",
+    'suggestion.negative.0': "I'm here for you 💙",
+    'suggestion.negative.1': "That's tough, I understand 🤗",
+    'suggestion.negative.2': "Sending you positive vibes ✨",
+    'suggestion.neutral.0': "Tell me more 💬",
+    'suggestion.neutral.1': "Interesting! 🤔",
+    'suggestion.neutral.2': "I see 👀",
+}
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(__file__), '../data/localized_strings.json')
+
+class LocalizedStrings:
+    """
+    Precomputed {language: {key: text}} table of the fixed strings in every
+    supported language, so localized suggestions are served from memory.
+    The table ships with the package and is read-only at runtime; missing
+    entries fall back to English. build() fills gaps as a build step.
+    """
+    def __init__(self, path: str = DEFAULT_TABLE_PATH):
+        self.path = path
+        self.table: Dict[str, Dict[str, str]] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.table = json.load(f)
+        except FileNotFoundError:
+            self.table = {}
+        except Exception as e:
+            print(f"Localized string table not loaded: {e}")
+            self.table = {}
+
+    def get(self, key: str, language: str = 'english') -> str:
+        """Localized string for key (language given as a name or code), falling back to English"""
+        return self.table.get(canonical_language(language), {}).get(key) or SOURCE_STRINGS[key]
+
+    def missing(self, languages: List[str]) -> Dict[str, List[str]]:
+        """Keys still untranslated, by language"""
+        gaps = {}
+        for language in languages:
+            entries = self.table.get(language, {})
+            keys = [key for key in SOURCE_STRINGS if key not in entries]
+            if keys:
+                gaps[language] = keys
+        return gaps
+
+    async def build(self, translation_service, save: bool = True) -> int:
+        """
+        Translate every missing string into every supported language, one
+        batch per language. Items that fail stay missing so the next build
+        retries them. Returns the number of strings added.
+        """
+        from .rate_limiter import Priority
+
+        gaps = self.missing(list(LANGUAGE_CODES))
+        if not gaps:
+            return 0
+
+        async def translate(language: str, keys: List[str]):
+            if language == 'english':
+                return language, keys, [{'translated_text': SOURCE_STRINGS[k], 'error': None} for k in keys]
+            results = await translation_service.translate_batch_results(
+                [SOURCE_STRINGS[key] for key in keys], 'english', language, Priority.BACKGROUND
+            )
+            return language, keys, results
+
+        added = 0
+        for language, keys, results in await asyncio.gather(*[translate(l, k) for l, k in gaps.items()]):
+            entries = self.table.setdefault(language, {})
+            for key, result in zip(keys, results):
+                if not result['error']:
+                    entries[key] = result['translated_text']
+                    added += 1
+
+        if added and save:
+            self.save()
+        print(f"Localized strings: {added} added, "
+              f"{sum(len(keys) for keys in self.missing(list(LANGUAGE_CODES)).values())} still missing")
+        return added
+
+    def save(self):
+        ordered = {
+            language: {key: entries[key] for key in SOURCE_STRINGS if key in entries}
+            for language, entries in sorted(self.table.items())
+        }
+        # Write beside the table and swap it in, so readers never see a partial file
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(ordered, f, ensure_ascii=False, indent=1)
+            f.write('\n')
+        os.replace(temp_path, self.path)
+
+    def get_stats(self) -> Dict:
+        return {
+            'languages': len(self.table),
+            'strings': sum(len(entries) for entries in self.table.values())
+        }
+
+localized_strings = LocalizedStrings()
+
+if __name__ == '__main__':
+    # Build step, run when SOURCE_STRINGS changes; review the result before committing:
+    # python -m app.services.localized_strings
+    from .translation_service import translation_service
+
+    async def main():
+        await localized_strings.build(translation_service)
+        await translation_service.close()
+
+    asyncio.run(main())
@@ -0,0 +1,321 @@
+import asyncio
+import heapq
+import itertools
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from enum import IntEnum
+from typing import Dict, Optional, Tuple
+
+class Priority(IntEnum):
+    """Traffic classes for upstream quota, most important first"""
+    LIVE = 0        # send_message
+    MANUAL = 1      # /chat/translate
+    BACKGROUND = 2  # batch jobs, warm-up, re-translation
+
+class QuotaExceeded(Exception):
+    """The request was shed by the upstream rate limiter"""
+    pass
+
+class ConcurrencyLimitExceeded(QuotaExceeded):
+    """The request waited too long for an upstream concurrency slot"""
+    pass
+
+class DailyQuotaStore:
+    """
+    Requests used per backend and UTC day, kept in SQLite so restarts keep
+    the count and every worker process on the host spends one budget.
+    Instances on other hosts keep their own file and their own count.
+    """
+    def __init__(self, db_path: str):
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS quota_usage ('
+            'name TEXT NOT NULL, day TEXT NOT NULL, used INTEGER NOT NULL, '
+            'PRIMARY KEY (name, day))'
+        )
+        # The connection is only used from this thread, off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='translation-quota')
+
+    def used(self, name: str, day: str) -> int:
+        row = self._db.execute('SELECT used FROM quota_usage WHERE name = ? AND day = ?', (name, day)).fetchone()
+        return row[0] if row else 0
+
+    def _take(self, name: str, day: str, ceiling: float) -> Tuple[bool, int]:
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            self._db.execute('INSERT OR IGNORE INTO quota_usage (name, day, used) VALUES (?, ?, 0)', (name, day))
+            cursor = self._db.execute(
+                'UPDATE quota_usage SET used = used + 1 WHERE name = ? AND day = ? AND used < ?',
+                (name, day, ceiling)
+            )
+            used = self.used(name, day)
+            self._db.execute('COMMIT')
+        except Exception:
+            self._db.execute('ROLLBACK')
+            raise
+        return cursor.rowcount == 1, used
+
+    async def take(self, name: str, day: str, ceiling: float) -> Tuple[bool, int]:
+        """Spend one request if fewer than ceiling are used; returns (granted, used)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._take, name, day, ceiling)
+
+class UpstreamRateLimiter:
+    """
+    Token-bucket limiter with a per-second rate and a daily budget for one
+    backend. Waiting requests are served in priority order, and lower
+    classes are shed once the remaining daily budget drops below their
+    reserve so live chat keeps the last part of the quota for itself.
+    The per-second rate is per process; the daily count is shared through
+    the store when one is given, and per process otherwise.
+    """
+    # Longest time each class will queue for a per-second token
+    MAX_WAIT_SECONDS = {
+        Priority.LIVE: 2.0,
+        Priority.MANUAL: 5.0,
+        Priority.BACKGROUND: 30.0
+    }
+
+    def __init__(self, daily_quota: int = 0, rate_per_second: float = 5.0, burst: int = 10,
+                 manual_reserve: float = 0.2, background_reserve: float = 0.5,
+                 name: str = 'upstream', store: Optional[DailyQuotaStore] = None):
+        self.name = name
+        self.store = store
+        self.daily_quota = daily_quota
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        # Fraction of the daily quota each class may not touch
+        self.reserves = {
+            Priority.LIVE: 0.0,
+            Priority.MANUAL: manual_reserve,
+            Priority.BACKGROUND: background_reserve
+        }
+
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._day = datetime.utcnow().date()
+        # Last count seen in the store (or the count itself without one)
+        self._used_today = self._stored_usage()
+        self._waiters = []
+        self._sequence = itertools.count()
+
+        self.stats = {
+            'granted': {p.name.lower(): 0 for p in Priority},
+            'shed': {p.name.lower(): 0 for p in Priority}
+        }
+
+    @property
+    def remaining_today(self) -> int:
+        self._roll_day()
+        if not self.daily_quota:
+            return -1
+        return max(self.daily_quota - self._used_today, 0)
+
+    def _stored_usage(self) -> int:
+        if self.store is None:
+            return 0
+        try:
+            return self.store.used(self.name, self._day.isoformat())
+        except Exception as e:
+            print(f"Translation quota store read error: {e}")
+            return 0
+
+    def _roll_day(self):
+        today = datetime.utcnow().date()
+        if today != self._day:
+            self._day = today
+            self._used_today = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate_per_second)
+        self._last_refill = now
+
+    def _shed(self, priority: Priority, reason: str):
+        self.stats['shed'][priority.name.lower()] += 1
+        raise QuotaExceeded(reason)
+
+    def _ceiling(self, priority: Priority) -> float:
+        """Requests this class may have used today before it is shed"""
+        return self.daily_quota * (1 - self.reserves[priority])
+
+    def _shed_daily(self, priority: Priority):
+        self._shed(priority, f"Daily translation quota reserved for higher priority traffic "
+                             f"({self.remaining_today} left)")
+
+    def _check_daily(self, priority: Priority, requests: int = 1):
+        """Shed early on the last known count, before queueing for a token"""
+        if not self.daily_quota:
+            return
+        self._roll_day()
+        if self._used_today + requests - 1 >= self._ceiling(priority):
+            self._shed_daily(priority)
+
+    def check_budget(self, priority: Priority, requests: int):
+        """Raise QuotaExceeded now if today's budget can't cover that many requests"""
+        self._check_daily(priority, requests)
+
+    async def _spend_daily(self, priority: Priority):
+        """Count one request against today's budget, or shed it"""
+        if not self.daily_quota:
+            return
+        self._roll_day()
+        ceiling = self._ceiling(priority)
+
+        if self.store is not None:
+            try:
+                granted, self._used_today = await self.store.take(self.name, self._day.isoformat(), ceiling)
+            except Exception as e:
+                print(f"Translation quota store error, counting in memory: {e}")
+            else:
+                if not granted:
+                    self._shed_daily(priority)
+                return
+
+        if self._used_today >= ceiling:
+            self._shed_daily(priority)
+        self._used_today += 1
+
+    async def acquire(self, priority: Priority = Priority.LIVE):
+        """Wait for an upstream slot, or raise QuotaExceeded if the request is shed"""
+        self._check_daily(priority)
+
+        deadline = time.monotonic() + self.MAX_WAIT_SECONDS[priority]
+        entry = (int(priority), next(self._sequence))
+        heapq.heappush(self._waiters, entry)
+
+        try:
+            while True:
+                self._refill()
+                if self._waiters[0] == entry and self._tokens >= 1:
+                    heapq.heappop(self._waiters)
+                    self._tokens -= 1
+                    break
+
+                if time.monotonic() >= deadline:
+                    self._shed(priority, "Timed out waiting for upstream rate limit")
+
+                await asyncio.sleep(max((1 - self._tokens) / self.rate_per_second, 0.005))
+        finally:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+
+        # Budget may have been used up while we queued, here or by other workers
+        await self._spend_daily(priority)
+        self.stats['granted'][priority.name.lower()] += 1
+
+    def get_stats(self) -> Dict:
+        self._refill()
+        return {
+            **self.stats,
+            'name': self.name,
+            'shared': self.store is not None,
+            'daily_quota': self.daily_quota,
+            'used_today': self._used_today,
+            'remaining_today': self.remaining_today,
+            'tokens': round(self._tokens, 2),
+            'queued': len(self._waiters)
+        }
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on concurrent calls to one upstream. Each fast, successful
+    response raises the limit by about one per limit's worth of calls; a
+    429, timeout or response slower than the latency target cuts it
+    multiplicatively, at most once per round trip so one burst of failures
+    counts once. Waiters are served in priority order and shed after
+    MAX_WAIT_SECONDS.
+    """
+    MAX_WAIT_SECONDS = UpstreamRateLimiter.MAX_WAIT_SECONDS
+
+    def __init__(self, initial_limit: int = 8, min_limit: int = 1, max_limit: int = 32,
+                 latency_target_ms: float = 2000.0, backoff: float = 0.5):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_ms = latency_target_ms
+        self.backoff = backoff
+
+        self.in_flight = 0
+        self.latency_ewma_ms: Optional[float] = None
+        self._last_decrease = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+
+        self.stats = {
+            'granted': 0,
+            'rejected': 0,
+            'increases': 0,
+            'decreases': 0
+        }
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(int(self.limit), self.min_limit)
+
+    def _wake(self):
+        """Hand free slots to the highest priority waiters still waiting"""
+        while self._waiters and self._has_capacity():
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(True)
+
+    async def acquire(self, priority: Priority = Priority.LIVE):
+        """Wait for a slot, or raise ConcurrencyLimitExceeded if the request is shed"""
+        if not self._waiters and self._has_capacity():
+            self.in_flight += 1
+            self.stats['granted'] += 1
+            return
+
+        future = asyncio.get_event_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+        try:
+            await asyncio.wait_for(future, timeout=self.MAX_WAIT_SECONDS[priority])
+        except asyncio.TimeoutError:
+            self.stats['rejected'] += 1
+            raise ConcurrencyLimitExceeded(f"Upstream concurrency limit {int(self.limit)} reached")
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        self.stats['granted'] += 1
+
+    def release(self, latency_ms: Optional[float] = None, overloaded: bool = False):
+        """
+        Return a slot. Pass the call latency on success, or overloaded=True
+        for 429s and timeouts; other failures leave the limit unchanged.
+        """
+        self.in_flight -= 1
+        now = time.monotonic()
+
+        if overloaded or (latency_ms is not None and latency_ms > self.latency_target_ms):
+            round_trip = (self.latency_ewma_ms or self.latency_target_ms) / 1000
+            if now - self._last_decrease >= round_trip:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self._last_decrease = now
+                self.stats['decreases'] += 1
+        elif latency_ms is not None and self.limit < self.max_limit:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self.stats['increases'] += 1
+
+        if latency_ms is not None:
+            self.latency_ewma_ms = latency_ms if self.latency_ewma_ms is None \
+                else 0.8 * self.latency_ewma_ms + 0.2 * latency_ms
+
+        self._wake()
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            'limit': round(self.limit, 2),
+            'in_flight': self.in_flight,
+            'queued': sum(1 for _, _, future in self._waiters if not future.done()),
+            'latency_ewma_ms': round(self.latency_ewma_ms, 2) if self.latency_ewma_ms is not None else None
+        }
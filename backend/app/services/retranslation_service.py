@@ -0,0 +1,231 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+from ..core.config import settings
+from .firebase_service import firebase_service
+from .translation_service import translation_service
+from .rate_limiter import Priority
+
+class RetranslationPaused(Exception):
+    """A whole page failed (usually the background quota ran out)"""
+    pass
+
+class RetranslationService:
+    """
+    Re-translates a user's recent history after a preferred language change.
+    Conversations are streamed newest first in pages through the batch
+    translator at BACKGROUND priority, and each page is written back with
+    batched writes. The job is checkpointed after every page, so a restarted
+    or paused job resumes where it stopped.
+    """
+    def __init__(self, page_size: int = 100, max_conversations: int = 20,
+                 max_messages: int = 500, user_concurrency: int = 2):
+        self.page_size = page_size
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.user_concurrency = user_concurrency
+
+        # One running job per user; a newer language change replaces it
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._jobs: Dict[str, Dict] = {}
+
+        self.stats = {
+            'started': 0,
+            'completed': 0,
+            'paused': 0,
+            'cancelled': 0,
+            'translated': 0,
+            'failed': 0
+        }
+
+    async def start(self, user_id: str, language: str) -> Dict:
+        """Start (or restart) re-translation of a user's history into language"""
+        await self.cancel(user_id)
+
+        conversations = await firebase_service.get_user_conversations(user_id)
+        now = datetime.utcnow()
+        job = {
+            'user_id': user_id,
+            'language': translation_service.canonical_language(language),
+            'status': 'running',
+            # conversation id -> {'cursor': oldest timestamp done, 'scanned': n, 'done': bool}
+            'conversations': {
+                conversation['id']: {'cursor': None, 'scanned': 0, 'done': False}
+                for conversation in conversations[:self.max_conversations]
+            },
+            'pages': 0,
+            'translated': 0,
+            'skipped': 0,
+            'failed': 0,
+            'error': None,
+            'started_at': now,
+            'updated_at': now
+        }
+
+        await firebase_service.save_retranslation_job(job)
+        self.stats['started'] += 1
+        self._spawn(job)
+        return self.get_progress_snapshot(job)
+
+    async def resume(self, user_id: str) -> Optional[Dict]:
+        """Continue a paused or interrupted job from its last checkpoint"""
+        task = self._tasks.get(user_id)
+        if task is not None and not task.done():
+            return self.get_progress_snapshot(self._jobs[user_id])
+
+        job = await firebase_service.get_retranslation_job(user_id)
+        if job is None:
+            return None
+
+        if job['status'] != 'completed':
+            job['status'] = 'running'
+            job['error'] = None
+            self._spawn(job)
+        return self.get_progress_snapshot(job)
+
+    async def resume_unfinished(self):
+        """Pick up jobs that were running when the previous worker stopped"""
+        for job in await firebase_service.get_unfinished_retranslation_jobs():
+            if job['user_id'] not in self._tasks:
+                self._spawn(job)
+
+    async def cancel(self, user_id: str):
+        task = self._tasks.pop(user_id, None)
+        if task is not None and not task.done():
+            task.cancel()
+            self.stats['cancelled'] += 1
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _spawn(self, job: Dict):
+        user_id = job['user_id']
+        self._jobs[user_id] = job
+        task = asyncio.create_task(self._run(job))
+        self._tasks[user_id] = task
+
+        def forget(done: asyncio.Task):
+            if self._tasks.get(user_id) is done:
+                del self._tasks[user_id]
+
+        task.add_done_callback(forget)
+
+    async def _run(self, job: Dict):
+        semaphore = asyncio.Semaphore(self.user_concurrency)
+
+        async def run_conversation(conversation_id: str):
+            async with semaphore:
+                await self._run_conversation(job, conversation_id)
+
+        pending = [cid for cid, state in job['conversations'].items() if not state['done']]
+        results = await asyncio.gather(*[run_conversation(cid) for cid in pending], return_exceptions=True)
+
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if any(isinstance(e, asyncio.CancelledError) for e in errors):
+            return
+
+        if errors:
+            job['status'] = 'paused'
+            job['error'] = str(errors[0]) or type(errors[0]).__name__
+            self.stats['paused'] += 1
+            print(f"Retranslation paused for {job['user_id']}: {job['error']}")
+        else:
+            job['status'] = 'completed'
+            self.stats['completed'] += 1
+
+        job['updated_at'] = datetime.utcnow()
+        await firebase_service.save_retranslation_job(job)
+
+    async def _run_conversation(self, job: Dict, conversation_id: str):
+        state = job['conversations'][conversation_id]
+
+        while not state['done']:
+            limit = min(self.page_size, self.max_messages - state['scanned'])
+            page = await firebase_service.get_message_page(conversation_id, limit, before=state['cursor']) if limit > 0 else []
+
+            if page:
+                await self._translate_page(job, page)
+                state['cursor'] = page[-1]['timestamp']
+                state['scanned'] += len(page)
+
+            state['done'] = len(page) < limit or limit <= 0
+            job['pages'] += 1
+            job['updated_at'] = datetime.utcnow()
+            # Checkpoint: a restart continues after the last written page
+            await firebase_service.save_retranslation_job(job)
+
+    async def _translate_page(self, job: Dict, page: List[Dict]):
+        """Translate the messages of one page the user receives, and write them back"""
+        language = job['language']
+
+        # Group by source language; the user's own messages and existing variants are skipped
+        by_source: Dict[str, List[Dict]] = {}
+        for message in page:
+            source = translation_service.canonical_language(message.get('language') or 'english')
+            if message.get('sender_id') == job['user_id'] or source == language \
+                    or language in (message.get('translations') or {}):
+                job['skipped'] += 1
+                continue
+            by_source.setdefault(source, []).append(message)
+
+        if not by_source:
+            return
+
+        sources = list(by_source)
+        batches = await asyncio.gather(*[
+            translation_service.translate_batch_results(
+                [message['text'] for message in by_source[source]],
+                source,
+                language,
+                Priority.BACKGROUND
+            )
+            for source in sources
+        ])
+
+        updates = {}
+        failed = 0
+        for source, results in zip(sources, batches):
+            for message, result in zip(by_source[source], results):
+                if result['error']:
+                    failed += 1
+                    continue
+                updates[message['id']] = {f"translations.{language}": result['translated_text']}
+
+        if updates and not await firebase_service.update_messages(updates):
+            raise RetranslationPaused("Failed to write translations back")
+
+        job['translated'] += len(updates)
+        job['failed'] += failed
+        self.stats['translated'] += len(updates)
+        self.stats['failed'] += failed
+
+        if failed and not updates:
+            # Nothing got through; stop and keep the cursor so resume retries this page
+            raise RetranslationPaused("Background translation budget exhausted")
+
+    def get_progress_snapshot(self, job: Dict) -> Dict:
+        conversations = job['conversations']
+        return {
+            **{k: v for k, v in job.items() if k != 'conversations'},
+            'conversations_total': len(conversations),
+            'conversations_done': sum(1 for state in conversations.values() if state['done']),
+            'messages_scanned': sum(state['scanned'] for state in conversations.values()),
+            'active': job['user_id'] in self._tasks
+        }
+
+    async def get_progress(self, user_id: str) -> Optional[Dict]:
+        """Progress of the user's current or last job"""
+        job = self._jobs.get(user_id) or await firebase_service.get_retranslation_job(user_id)
+        return self.get_progress_snapshot(job) if job else None
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'running': len(self._tasks)}
+
+# Create singleton instance
+retranslation_service = RetranslationService(
+    page_size=settings.RETRANSLATION_PAGE_SIZE,
+    max_conversations=settings.RETRANSLATION_MAX_CONVERSATIONS,
+    max_messages=settings.RETRANSLATION_MAX_MESSAGES,
+    user_concurrency=settings.RETRANSLATION_USER_CONCURRENCY
+)
@@ -0,0 +1,251 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from ..core.config import settings
+from ..core.singleflight import SingleFlight
+from .firebase_service import firebase_service
+from .sentiment_service import classify
+
+def empty_aggregate() -> Dict:
+    return {
+        'count': 0,
+        'sum': 0.0,
+        'sum_sq': 0.0,
+        # Exponentially decayed polarity sum and weight, as of ew_at (epoch seconds)
+        'ew_sum': 0.0,
+        'ew_weight': 0.0,
+        'ew_at': None
+    }
+
+# Fields written as increments, so every worker's messages add up in Firestore
+ADDITIVE_FIELDS = ('count', 'sum', 'sum_sq')
+
+def empty_delta() -> Dict:
+    return {'conversation': {}, 'participants': {}}
+
+def add_fields(target: Dict, fields: Dict):
+    for key, value in fields.items():
+        target[key] = target.get(key, 0) + value
+
+class SentimentAggregates:
+    """
+    Rolling sentiment of each conversation and each of its participants:
+    message count, polarity sum and sum of squares (mean, variance), and an
+    exponentially decayed score that follows the recent mood. Every message
+    updates them in O(1) in memory. A conversation is read from Firestore at
+    most once per process, and dirty ones are written back in batches every
+    few seconds (and on close), so reads never touch the messages.
+
+    Workers write the count, sum and sum_sq recorded since their last flush
+    as increments, so no message is lost when several workers share a
+    conversation. The decayed score can't be merged that way and is last
+    writer wins. A worker's in-memory totals only include other workers'
+    messages up to the time it loaded the conversation.
+    """
+    def __init__(self, half_life_seconds: float = 6 * 60 * 60, flush_interval: float = 5.0,
+                 max_conversations: int = 10000):
+        self.half_life_seconds = half_life_seconds
+        self.flush_interval = flush_interval
+        self.max_conversations = max_conversations
+
+        # conversation id -> {'conversation': aggregate, 'participants': {user id: aggregate}}
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._dirty = set()
+        # Conversations whose write is in flight; like dirty ones, never evicted
+        self._flushing = set()
+        # conversation id -> additive fields recorded since the last flush, shaped like an entry
+        self._deltas: Dict[str, Dict] = {}
+        self._loads = SingleFlight()
+        self._flusher: Optional[asyncio.Task] = None
+
+        self.stats = {
+            'recorded': 0,
+            'loaded': 0,
+            'flushes': 0,
+            'written': 0,
+            'flush_errors': 0,
+            'evicted': 0
+        }
+
+    def _decay(self, elapsed: float) -> float:
+        return 0.5 ** (max(elapsed, 0.0) / self.half_life_seconds)
+
+    def _update(self, aggregate: Dict, delta: Dict, polarity: float, now: float):
+        decay = self._decay(now - aggregate['ew_at']) if aggregate['ew_at'] is not None else 0.0
+        added = {'count': 1, 'sum': polarity, 'sum_sq': polarity * polarity}
+        add_fields(aggregate, added)
+        add_fields(delta, added)
+        aggregate['ew_sum'] = aggregate['ew_sum'] * decay + polarity
+        aggregate['ew_weight'] = aggregate['ew_weight'] * decay + 1.0
+        aggregate['ew_at'] = now
+
+    def summarize(self, aggregate: Dict, now: Optional[float] = None) -> Dict:
+        """Mean, spread and recent mood of one aggregate"""
+        now = time.time() if now is None else now
+        count = aggregate['count']
+        mean = aggregate['sum'] / count if count else 0.0
+        variance = max(aggregate['sum_sq'] / count - mean * mean, 0.0) if count else 0.0
+        recent = aggregate['ew_sum'] / aggregate['ew_weight'] if aggregate['ew_weight'] else 0.0
+        # Effective number of recent messages behind the recent score
+        weight = aggregate['ew_weight'] * self._decay(now - aggregate['ew_at']) if aggregate['ew_at'] else 0.0
+        label = classify(recent, 0.0)
+
+        return {
+            'count': count,
+            'mean': round(mean, 4),
+            'variance': round(variance, 4),
+            'std': round(math.sqrt(variance), 4),
+            'recent_score': round(recent, 4),
+            'recent_weight': round(weight, 4),
+            'sentiment': label['sentiment'],
+            'emoji': label['emoji']
+        }
+
+    async def _entry(self, conversation_id: str) -> Dict:
+        entry = self._entries.get(conversation_id)
+        if entry is not None:
+            self._entries.move_to_end(conversation_id)
+            return entry
+
+        async def load():
+            stored = await firebase_service.get_sentiment_aggregate(conversation_id)
+            self.stats['loaded'] += 1
+            return {
+                'conversation': {**empty_aggregate(), **(stored or {}).get('conversation', {})},
+                'participants': {
+                    user_id: {**empty_aggregate(), **aggregate}
+                    for user_id, aggregate in (stored or {}).get('participants', {}).items()
+                }
+            }
+
+        loaded = await self._loads.do(conversation_id, load)
+        # Concurrent callers share one load; the first to get here installs it
+        entry = self._entries.setdefault(conversation_id, loaded)
+        self._evict()
+        return entry
+
+    def _evict(self):
+        while len(self._entries) > self.max_conversations:
+            oldest = next(iter(self._entries))
+            if oldest in self._dirty or oldest in self._flushing:
+                # Evicted once a flush has written it
+                break
+            del self._entries[oldest]
+            self.stats['evicted'] += 1
+
+    async def record(self, conversation_id: str, user_id: str, polarity: float, now: Optional[float] = None):
+        """Add one scored message to its conversation's and sender's aggregates"""
+        try:
+            now = time.time() if now is None else now
+            entry = await self._entry(conversation_id)
+            delta = self._deltas.setdefault(conversation_id, empty_delta())
+            self._update(entry['conversation'], delta['conversation'], polarity, now)
+            self._update(
+                entry['participants'].setdefault(user_id, empty_aggregate()),
+                delta['participants'].setdefault(user_id, {}),
+                polarity, now
+            )
+            self._dirty.add(conversation_id)
+            self.stats['recorded'] += 1
+        except Exception as e:
+            print(f"Sentiment aggregate error: {e}")
+
+    async def get(self, conversation_id: str) -> Dict:
+        """Summary of a conversation and its participants"""
+        entry = await self._entry(conversation_id)
+        now = time.time()
+        return {
+            'conversation_id': conversation_id,
+            **self.summarize(entry['conversation'], now),
+            'participants': {
+                user_id: self.summarize(aggregate, now)
+                for user_id, aggregate in entry['participants'].items()
+            }
+        }
+
+    def _document(self, conversation_id: str, delta: Dict) -> Dict:
+        """Firestore update for one conversation: additive deltas plus the current decayed score"""
+        entry = self._entries[conversation_id]
+
+        def fields(aggregate: Dict, added: Dict) -> Dict:
+            current = {key: value for key, value in aggregate.items() if key not in ADDITIVE_FIELDS}
+            return {**current, **{key: added.get(key, 0) for key in ADDITIVE_FIELDS}}
+
+        return {
+            'conversation': fields(entry['conversation'], delta['conversation']),
+            'participants': {
+                user_id: fields(entry['participants'][user_id], added)
+                for user_id, added in delta['participants'].items()
+            }
+        }
+
+    def _restore(self, conversation_id: str, delta: Dict):
+        """Put back deltas that were not written, to be retried by the next flush"""
+        pending = self._deltas.setdefault(conversation_id, empty_delta())
+        add_fields(pending['conversation'], delta['conversation'])
+        for user_id, added in delta['participants'].items():
+            add_fields(pending['participants'].setdefault(user_id, {}), added)
+        self._dirty.add(conversation_id)
+
+    async def flush(self):
+        """Write every dirty conversation back in one batch"""
+        if not self._dirty:
+            return
+        keys = list(self._dirty)
+        self._dirty.clear()
+        deltas = {key: self._deltas.pop(key) for key in keys if key in self._deltas}
+        self._flushing.update(deltas)
+
+        saved = []
+        try:
+            docs = {key: self._document(key, delta) for key, delta in deltas.items()}
+            saved = await firebase_service.save_sentiment_aggregates(docs)
+        finally:
+            # Also reached when cancelled mid-write; anything unconfirmed is retried
+            self._flushing.difference_update(deltas)
+            saved = set(saved)
+            for key, delta in deltas.items():
+                if key not in saved:
+                    self._restore(key, delta)
+            if saved:
+                self.stats['flushes'] += 1
+                self.stats['written'] += len(saved)
+                self._evict()
+            if len(saved) < len(deltas):
+                self.stats['flush_errors'] += 1
+
+    async def _flush_forever(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Sentiment aggregate flush error: {e}")
+
+    def start(self):
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_forever())
+
+    async def close(self):
+        """Stop the periodic flush and write everything still pending"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                # A flush cut short puts its deltas back before this returns
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'conversations': len(self._entries), 'dirty': len(self._dirty)}
+
+# Create singleton instance
+sentiment_aggregates = SentimentAggregates(
+    half_life_seconds=settings.SENTIMENT_AGGREGATE_HALF_LIFE_SECONDS,
+    flush_interval=settings.SENTIMENT_AGGREGATE_FLUSH_SECONDS,
+    max_conversations=settings.SENTIMENT_AGGREGATE_MAX_CONVERSATIONS
+)
@@ -0,0 +1,356 @@
+import json
+import os
+import re
+import unicodedata
+from itertools import repeat
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Texts of plain words with "!", "?" and "," don't need TextBlob's tokenizer: it only
+# splits those marks off the ends of words. "x D" is excluded because the tokenizer
+# glues it into the "xD" emoticon.
+PLAIN_TEXT = re.compile(r"[A-Za-z0-9 !?,]*")
+PLAIN_TOKEN = re.compile(r"[^\s!?,](?:\S*[^\s!?,])?|[!?,]")
+GLUED_EMOTICON = re.compile(r"[xX] +D")
+
+INDIC_LEXICON_PATH = os.path.join(os.path.dirname(__file__), '../data/indic_sentiment.json')
+
+# Words are separated by whitespace and punctuation, including the danda;
+# \w would split Indic words at their vowel signs
+INDIC_TOKEN = re.compile(r"[^\s.,!?;:'\"()\[\]{}<>/\\|\u0964\u0965\u06d4\u2026-]+")
+LATIN_LETTER = re.compile(r"[A-Za-z]")
+
+# Negations and intensifiers reach a sentiment word at most this many tokens away
+INDIC_WINDOW = 2
+# Shorter stems only match whole words ("ना" must not match "नाम")
+INDIC_MIN_STEM = 4
+
+# Automaton state before each token: modifier (none, adverb, "-ly" adverb) x pending negation
+STATES = 6
+BOOST = 1.25
+
+class CompiledLexicon:
+    """
+    TextBlob's pattern sentiment lexicon compiled into flat arrays, scored
+    for a whole batch of texts at once. Tokens are mapped to ids, the
+    modifier/negation rules run as a finite-state automaton evaluated with
+    a parallel prefix scan, and assessments are averaged per text with
+    bincount. Results are identical to TextBlob(text).sentiment.
+    """
+    def __init__(self):
+        from textblob.en import sentiment
+        from textblob._text import EMOTICONS, PUNCTUATION
+
+        if not dict.__len__(sentiment):
+            sentiment.load()
+        self._tokenizer = sentiment.tokenizer
+
+        words = sorted(dict.keys(sentiment))
+        self.ids = {word: index for index, word in enumerate(words)}
+        scores = [dict.__getitem__(sentiment, word)[None] for word in words]
+        self.polarity = np.array([score[0] for score in scores], dtype=np.float64)
+        self.subjectivity = np.array([score[1] for score in scores], dtype=np.float64)
+        self.intensity = np.array([score[2] for score in scores], dtype=np.float64)
+        self.modifier = np.array([
+            any(pos in sentiment.modifiers for pos in dict.__getitem__(sentiment, word) if pos)
+            for word in words
+        ], dtype=bool)
+        self.ly = np.array([sentiment.modifier(word) for word in words], dtype=bool)
+        self.negation = np.array([word in sentiment.negations for word in words], dtype=bool)
+
+        # Tokens that only matter when they are not lexicon words get ids after the vocabulary
+        self.unknown = len(words)
+        specials = list(dict.fromkeys(
+            [w for w in sentiment.negations if w not in self.ids] +
+            [w for w in ("!", "(!)") if w not in self.ids]
+        ))
+        emoticons = {}
+        for (_, polarity), faces in EMOTICONS.items():
+            for face in faces:
+                face = face.lower()
+                if not face.isalpha() and len(face) <= 5 and face not in PUNCTUATION and face not in self.ids:
+                    emoticons.setdefault(face, polarity)
+        specials += [face for face in emoticons if face not in specials]
+        for offset, token in enumerate(specials, start=self.unknown + 1):
+            self.ids[token] = offset
+
+        size = self.unknown + 1 + len(specials)
+        padding = size - self.unknown
+        self.polarity = np.concatenate([self.polarity, np.zeros(padding)])
+        self.subjectivity = np.concatenate([self.subjectivity, np.zeros(padding)])
+        self.intensity = np.concatenate([self.intensity, np.ones(padding)])
+        self.known = np.arange(size) < self.unknown
+        self.modifier = np.concatenate([self.modifier, np.zeros(padding, dtype=bool)])
+        self.ly = np.concatenate([self.ly, np.zeros(padding, dtype=bool)])
+        self.negation = np.concatenate([self.negation, np.zeros(padding, dtype=bool)])
+        for token in specials:
+            self.negation[self.ids[token]] = token in sentiment.negations
+        self.exclamation = np.zeros(size, dtype=bool)
+        self.irony = np.zeros(size, dtype=bool)
+        self.emoticon = np.full(size, np.nan)
+        if "!" in specials:
+            self.exclamation[self.ids["!"]] = True
+        if "(!)" in specials:
+            self.irony[self.ids["(!)"]] = True
+        for face, polarity in emoticons.items():
+            self.emoticon[self.ids[face]] = polarity
+
+    def __len__(self):
+        return self.unknown
+
+    def tokenize(self, text: str) -> List[str]:
+        """Lowercased tokens, exactly as TextBlob's sentiment analyzer sees them"""
+        if PLAIN_TEXT.fullmatch(text) and not GLUED_EMOTICON.search(text):
+            return PLAIN_TOKEN.findall(text.lower())
+        return " ".join(self._tokenizer(text)).lower().split()
+
+    def encode(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Token ids, a (len > 1, len > 2) length class per token, and each text's token offset"""
+        tokens = []
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        for index, text in enumerate(texts):
+            tokens.extend(self.tokenize(text))
+            offsets[index + 1] = len(tokens)
+
+        count = len(tokens)
+        ids = np.fromiter(map(self.ids.get, tokens, repeat(self.unknown)), dtype=np.int64, count=count)
+        longer_than_1 = np.fromiter(map(len, map(str.strip, tokens, repeat("'"))), dtype=np.int64, count=count) > 1
+        longer_than_2 = np.fromiter(map(len, tokens), dtype=np.int64, count=count) > 2
+        return ids, np.stack([longer_than_1, longer_than_2]), offsets
+
+    def _transitions(self, ids: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """Next automaton state for every (token, state) pair, shape (tokens, STATES)"""
+        known = self.known[ids][:, None]
+        negation = self.negation[ids][:, None]
+        longer_than_1, longer_than_2 = lengths[0][:, None], lengths[1][:, None]
+
+        state = np.arange(STATES)[None, :]
+        m, n = state // 2, (state % 2).astype(bool)
+
+        # Lexicon word: it becomes the modifier if it is an adverb, and may start a negation
+        known_m = np.where(self.modifier[ids], np.where(self.ly[ids], 2, 1), 0)[:, None]
+        known_next = known_m * 2 + negation
+
+        # Other token: negations carry across short words, "-ly" adverbs absorb them
+        pending = negation | (n & ~longer_than_1)
+        absorbed = pending & (m == 2)
+        other_m = np.where(absorbed | ~longer_than_2, m, 0)
+        other_next = other_m * 2 + (pending & ~absorbed)
+
+        return np.where(known, known_next, other_next).astype(np.int8)
+
+    def _states(self, transitions: np.ndarray, starts: np.ndarray, longest: int) -> np.ndarray:
+        """State before each token: Hillis-Steele scan over composed transition functions"""
+        # A text starts from the empty state whatever came before it in the batch,
+        # so log2(longest text) doubling steps cover every prefix
+        scan = transitions.copy()
+        scan[starts] = scan[starts][:, :1]
+        step = 1
+        while step < longest:
+            scan[step:] = np.take_along_axis(scan[step:], scan[:-step].astype(np.int64), axis=1)
+            step *= 2
+
+        before = np.zeros(len(scan), dtype=np.int64)
+        before[1:] = scan[:-1, 0]
+        before[starts] = 0
+        return before
+
+    def score(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(polarity, subjectivity) arrays for texts"""
+        ids, lengths, offsets = self.encode(texts)
+        polarity = np.zeros(len(texts))
+        subjectivity = np.zeros(len(texts))
+        if not len(ids):
+            return polarity, subjectivity
+
+        sizes = np.diff(offsets)
+        text_of = np.repeat(np.arange(len(texts)), sizes)
+        starts = offsets[:-1][sizes > 0]
+        state = self._states(self._transitions(ids, lengths), starts, int(sizes.max()))
+        m, n = state // 2, (state % 2).astype(bool)
+
+        known = self.known[ids]
+        emoticon = self.emoticon[ids]
+        pending = self.negation[ids] | (n & ~lengths[0])
+
+        # Assessments are created by lexicon words after no modifier, "(!)" and emoticons
+        creates = (known & (m == 0)) | (~known & (self.irony[ids] | ~np.isnan(emoticon)))
+        created = np.cumsum(creates)
+        before_text = np.repeat(np.concatenate([[0], created])[offsets[:-1]], sizes)
+        # Every other event updates the latest assessment (a[-1])
+        target = created - 1
+        has_target = created > before_text
+
+        # Writes set an assessment's polarity/subjectivity: creations and modified lexicon words
+        writes = np.flatnonzero(known | creates)
+        w_ids = ids[writes]
+        w_known = known[writes]
+        w_merge = w_known & (m[writes] > 0)
+        w_negated = w_known & n[writes]
+
+        intensity = np.where(w_known, self.intensity[w_ids], 1.0)
+        intensity = np.where(w_negated, 1.0 / intensity, intensity)
+        previous = np.concatenate([[1.0], intensity[:-1]])
+
+        w_polarity = np.where(w_known, self.polarity[w_ids], np.nan_to_num(emoticon[writes]))
+        w_subjectivity = np.where(w_known, self.subjectivity[w_ids], 1.0)
+        w_polarity = np.where(w_merge, np.clip(w_polarity * previous, -1.0, 1.0), w_polarity)
+        w_subjectivity = np.where(w_merge, np.clip(w_subjectivity * previous, -1.0, 1.0), w_subjectivity)
+
+        # The last write of each assessment holds its scores
+        assessments = int(created[-1])
+        w_target = target[writes]
+        last = np.r_[w_target[1:] != w_target[:-1], True]
+        a_polarity = np.zeros(assessments)
+        a_subjectivity = np.zeros(assessments)
+        last_write = np.zeros(assessments, dtype=np.int64)
+        a_polarity[w_target[last]] = w_polarity[last]
+        a_subjectivity[w_target[last]] = w_subjectivity[last]
+        last_write[w_target[last]] = writes[last]
+
+        # "!" boosts the latest assessment; a later write would overwrite it
+        position = np.arange(len(ids))
+        boosts = self.exclamation[ids] & ~known & has_target
+        boosts &= position > last_write[np.where(has_target, target, 0)]
+        counts = np.bincount(target[boosts], minlength=assessments)
+        for round_ in range(int(counts.max()) if assessments else 0):
+            a_polarity = np.where(counts > round_, np.clip(a_polarity * BOOST, -1.0, 1.0), a_polarity)
+
+        # "not good" = slightly bad, "not bad" = slightly good
+        negated = np.zeros(assessments, dtype=bool)
+        negated[w_target[w_negated]] = True
+        negated[target[~known & pending & (m == 2)]] = True
+        a_polarity = np.where(negated, a_polarity * -0.5, a_polarity)
+
+        a_text = text_of[position[creates]]
+        per_text = np.bincount(a_text, minlength=len(texts))
+        polarity = np.bincount(a_text, a_polarity, minlength=len(texts)) / np.maximum(per_text, 1)
+        subjectivity = np.bincount(a_text, a_subjectivity, minlength=len(texts)) / np.maximum(per_text, 1)
+        return polarity, subjectivity
+
+def _normalize_indic(text: str) -> str:
+    # NFC (nukta forms decompose consistently) without zero-width joiners
+    return unicodedata.normalize('NFC', text).replace('\u200c', '').replace('\u200d', '')
+
+class IndicLexicon:
+    """
+    Compact polarity lexicon for one Indic language, compiled into arrays.
+    Each sentiment word carries (polarity, subjectivity); a negation flips
+    the nearest sentiment word just before it (Indic word order: "अच्छा
+    नहीं") or else just after it, like pattern's "not good" = -0.5 x good;
+    an intensifier scales the next one. For agglutinative languages,
+    inflected forms match their stem ("நல்லது" -> "நல்ல").
+    """
+    WORD, NEGATION, INTENSIFIER = 0, 1, 2
+
+    def __init__(self, entry: Dict):
+        words = {_normalize_indic(w): score for w, score in entry['words'].items()}
+        negations = {_normalize_indic(w) for w in entry['negations']}
+        intensifiers = {_normalize_indic(w): factor for w, factor in entry['intensifiers'].items()}
+
+        vocabulary = sorted(set(words) | negations | set(intensifiers))
+        self.ids = {word: index for index, word in enumerate(vocabulary)}
+        self.polarity = np.array([words.get(w, (0.0, 0.0))[0] for w in vocabulary], dtype=np.float64)
+        self.subjectivity = np.array([words.get(w, (0.0, 0.0))[1] for w in vocabulary], dtype=np.float64)
+        self.factor = np.array([intensifiers.get(w, 1.0) for w in vocabulary], dtype=np.float64)
+        self.kind = np.array([
+            self.WORD if w in words else self.NEGATION if w in negations else self.INTENSIFIER
+            for w in vocabulary
+        ], dtype=np.int8)
+
+        stems = [w for w in vocabulary if entry.get('stems') and w in words and len(w) >= INDIC_MIN_STEM]
+        self.stems = np.array(stems) if stems else None
+        self.stem_ids = np.array([self.ids[w] for w in stems], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _lookup(self, tokens: List[str]) -> np.ndarray:
+        """Lexicon id per token, -1 if none"""
+        ids = np.fromiter(map(self.ids.get, tokens, repeat(-1)), dtype=np.int64, count=len(tokens))
+        missing = np.flatnonzero(ids < 0)
+        if self.stems is not None and len(missing):
+            # A stem of the token sorts right before it; keep the closest one if it is a prefix
+            candidates = np.array([tokens[i] for i in missing])
+            at = np.searchsorted(self.stems, candidates, side='right') - 1
+            found = at >= 0
+            prefix = np.zeros(len(missing), dtype=bool)
+            prefix[found] = np.char.startswith(candidates[found], self.stems[at[found]])
+            ids[missing[prefix]] = self.stem_ids[at[prefix]]
+        return ids
+
+    def score(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(polarity, subjectivity, sentiment words found) arrays for texts"""
+        tokens = []
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        for index, text in enumerate(texts):
+            tokens.extend(INDIC_TOKEN.findall(_normalize_indic(text)))
+            offsets[index + 1] = len(tokens)
+
+        polarity = np.zeros(len(texts))
+        subjectivity = np.zeros(len(texts))
+        if not tokens:
+            return polarity, subjectivity, np.zeros(len(texts), dtype=np.int64)
+
+        ids = self._lookup(tokens)
+        sizes = np.diff(offsets)
+        text_of = np.repeat(np.arange(len(texts)), sizes)
+        first = offsets[:-1][text_of]
+        last = offsets[1:][text_of] - 1
+
+        kind = np.where(ids >= 0, self.kind[np.maximum(ids, 0)], -1)
+        position = np.arange(len(ids))
+        is_word = kind == self.WORD
+
+        # Nearest sentiment word strictly before / after each token, within its text
+        before = np.maximum.accumulate(np.where(is_word, position, -1))
+        before = np.concatenate([[-1], before[:-1]])
+        has_before = (before >= first) & (position - before <= INDIC_WINDOW)
+        after = np.minimum.accumulate(np.where(is_word, position, len(ids))[::-1])[::-1]
+        after = np.concatenate([after[1:], [len(ids)]])
+        has_after = (after <= last) & (after - position <= INDIC_WINDOW)
+
+        negation = kind == self.NEGATION
+        negated = np.zeros(len(ids), dtype=bool)
+        negated[before[negation & has_before]] = True
+        negated[after[negation & ~has_before & has_after]] = True
+
+        intensifier = (kind == self.INTENSIFIER) & has_after
+        factor = np.ones(len(ids))
+        np.multiply.at(factor, after[intensifier], self.factor[ids[intensifier]])
+
+        words = np.flatnonzero(is_word)
+        w_polarity = np.clip(self.polarity[ids[words]] * factor[words], -1.0, 1.0)
+        w_polarity = np.where(negated[words], w_polarity * -0.5, w_polarity)
+        w_subjectivity = np.clip(self.subjectivity[ids[words]] * factor[words], 0.0, 1.0)
+
+        w_text = text_of[words]
+        found = np.bincount(w_text, minlength=len(texts))
+        polarity = np.bincount(w_text, w_polarity, minlength=len(texts)) / np.maximum(found, 1)
+        subjectivity = np.bincount(w_text, w_subjectivity, minlength=len(texts)) / np.maximum(found, 1)
+        return polarity, subjectivity, found
+
+_lexicon: Optional[CompiledLexicon] = None
+_indic_lexicons: Optional[Dict[str, IndicLexicon]] = None
+
+def get_lexicon() -> CompiledLexicon:
+    """The compiled lexicon, built on first use"""
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = CompiledLexicon()
+    return _lexicon
+
+def get_indic_lexicon(code: str) -> Optional[IndicLexicon]:
+    """The compiled lexicon for a language code, None if there is none"""
+    global _indic_lexicons
+    if _indic_lexicons is None:
+        try:
+            with open(INDIC_LEXICON_PATH, encoding='utf-8') as f:
+                _indic_lexicons = {language: IndicLexicon(entry) for language, entry in json.load(f).items()}
+        except Exception as e:
+            print(f"Indic sentiment lexicons not loaded: {e}")
+            _indic_lexicons = {}
+    return _indic_lexicons.get(code)
+
+def has_latin(text: str) -> bool:
+    return LATIN_LETTER.search(text) is not None
@@ -1,9 +1,216 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from textblob import TextBlob
-from typing import Dict
+from typing import Dict, List, Optional
+from ..core.config import settings
+from .localized_strings import localized_strings, SOURCE_STRINGS
+from .sentiment_lexicon import get_lexicon, get_indic_lexicon, has_latin
+
+NEUTRAL_RESULT = {
+    'sentiment': 'neutral',
+    'emoji': '😐',
+    'polarity': 0,
+    'subjectivity': 0,
+    'confidence': 0
+}
+
+def _warm_worker():
+    """Pool initializer: load TextBlob's analyzer and the compiled lexicon once per process"""
+    TextBlob("warm up").sentiment
+    get_lexicon()
+
+def _analyze_in_worker(text: str) -> Dict:
+    return sentiment_service.analyze_sentiment(text)
+
+def _analyze_batch_in_worker(texts: List[str]) -> List[Dict]:
+    return sentiment_service.analyze_batch(texts)
+
+def _spawn_and_warm(pool: ProcessPoolExecutor, workers: int):
+    """Start every worker of pool and wait until each has warmed up (blocking)"""
+    futures = [pool.submit(_analyze_in_worker, "warm up") for _ in range(workers)]
+    for future in futures:
+        future.result()
+
+def classify(polarity: float, subjectivity: float) -> Dict:
+    """Sentiment label, emoji and rounded scores for a polarity/subjectivity pair"""
+    if polarity > 0.1:
+        sentiment = 'positive'
+        emoji = '😊'
+    elif polarity < -0.1:
+        sentiment = 'negative'
+        emoji = '😔'
+    else:
+        sentiment = 'neutral'
+        emoji = '😐'
+    
+    return {
+        'sentiment': sentiment,
+        'emoji': emoji,
+        'polarity': round(polarity, 2),
+        'subjectivity': round(subjectivity, 2),
+        'confidence': abs(polarity)
+    }
 
 class SentimentService:
-    def __init__(self):
-        pass
+    def __init__(self, workers: int = 2, timeout: float = 2.0, use_process_pool: bool = True):
+        self.workers = workers
+        self.timeout = timeout
+        self.use_process_pool = use_process_pool
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Replacement pool being spawned in the background, see _respawn
+        self._spawning: Optional[ProcessPoolExecutor] = None
+        self._respawn_task: Optional[asyncio.Task] = None
+        self.stats = {'analyzed': 0, 'timeouts': 0, 'errors': 0, 'fallbacks': 0, 'respawns': 0}
+        # How messages were scored, see analyze_message_async
+        self.routes = {'english': 0, 'translation': 0, 'lexicon': 0, 'unsupported': 0}
+    
+    def _new_pool(self) -> ProcessPoolExecutor:
+        """A worker pool (spawned, so no event-loop state is forked)"""
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_warm_worker
+        )
+    
+    def start(self) -> Optional[ProcessPoolExecutor]:
+        """Create the worker pool at startup"""
+        if self.use_process_pool and self._pool is None:
+            self._pool = self._new_pool()
+        return self._pool
+    
+    def _live_pool(self) -> Optional[ProcessPoolExecutor]:
+        """
+        The pool for a request, or None to use the in-thread fallback. A
+        missing pool is respawned and warmed in the background, never on
+        the request path.
+        """
+        if self._pool is None and self.use_process_pool:
+            self._respawn()
+        return self._pool
+    
+    def _respawn(self):
+        if self._respawn_task is None or self._respawn_task.done():
+            self._respawn_task = asyncio.get_event_loop().create_task(self._respawn_pool())
+    
+    async def _respawn_pool(self):
+        pool = self._spawning = self._new_pool()
+        try:
+            # Process start and warm-up block, so they run in a thread
+            await asyncio.to_thread(_spawn_and_warm, pool, self.workers)
+            self._pool = pool
+            self.stats['respawns'] += 1
+        except Exception as e:
+            pool.shutdown(wait=False, cancel_futures=True)
+            print(f"Sentiment worker pool respawn failed: {e}")
+        finally:
+            self._spawning = None
+    
+    def _discard_broken(self, pool: ProcessPoolExecutor, error: Exception):
+        """Shut down a broken pool (once, however many requests saw it fail) and respawn"""
+        self.stats['errors'] += 1
+        print(f"Sentiment worker pool broken: {error}")
+        if self._pool is pool:
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._respawn()
+    
+    async def warm_up(self):
+        """Start every worker up front so the first messages don't pay for it"""
+        pool = self.start()
+        if pool is None:
+            return
+        loop = asyncio.get_event_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(pool, _analyze_in_worker, "warm up")
+            for _ in range(self.workers)
+        ], return_exceptions=True)
+    
+    async def analyze_sentiment_async(self, text: str) -> Dict:
+        """
+        Analyze sentiment in the process pool, off the event loop. While
+        the pool is being (re)spawned the text is analyzed in a thread.
+        Falls back to neutral on timeout or other failures.
+        """
+        if not self.use_process_pool:
+            return self.analyze_sentiment(text)
+        pool = self._live_pool()
+        if pool is None:
+            self.stats['fallbacks'] += 1
+            return await asyncio.to_thread(self.analyze_sentiment, text)
+        
+        try:
+            loop = asyncio.get_event_loop()
+            result = await asyncio.wait_for(
+                loop.run_in_executor(pool, _analyze_in_worker, text),
+                timeout=self.timeout
+            )
+            self.stats['analyzed'] += 1
+            return result
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            print("Sentiment analysis timed out")
+        except BrokenProcessPool as e:
+            # A worker died; serve this text in a thread while a fresh pool starts
+            self._discard_broken(pool, e)
+            self.stats['fallbacks'] += 1
+            return await asyncio.to_thread(self.analyze_sentiment, text)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Sentiment analysis error: {e}")
+        return dict(NEUTRAL_RESULT)
+    
+    async def analyze_message_async(self, text: str, language: Optional[str] = None,
+                                    english_text: Optional[str] = None) -> Dict:
+        """
+        Analyze a chat message by its language code. English text, or the
+        English translation when one was already computed, goes through
+        TextBlob; otherwise the language's compact lexicon scores the
+        original. Romanized text the lexicon doesn't cover still goes
+        through TextBlob, and anything else is neutral.
+        """
+        language = (language or 'en').lower()
+        if language == 'en':
+            self.routes['english'] += 1
+            return await self.analyze_sentiment_async(text)
+        # A failed translation comes back as the original text
+        if english_text and english_text != text:
+            self.routes['translation'] += 1
+            return await self.analyze_sentiment_async(english_text)
+        
+        lexicon = get_indic_lexicon(language)
+        if lexicon is not None:
+            try:
+                polarity, subjectivity, found = lexicon.score([text])
+                if found[0] or not has_latin(text):
+                    self.routes['lexicon'] += 1
+                    return classify(float(polarity[0]), float(subjectivity[0]))
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"Lexicon sentiment error: {e}")
+        
+        if has_latin(text):
+            self.routes['english'] += 1
+            return await self.analyze_sentiment_async(text)
+        self.routes['unsupported'] += 1
+        return dict(NEUTRAL_RESULT)
+    
+    def close(self):
+        if self._respawn_task is not None:
+            self._respawn_task.cancel()
+        for pool in (self._pool, self._spawning):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+    
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            'routes': dict(self.routes),
+            'workers': self.workers if self._pool else 0,
+            'respawning': self._spawning is not None
+        }
     
     def analyze_sentiment(self, text: str) -> Dict:
         """
@@ -12,57 +219,67 @@ class SentimentService:
         """
         try:
             blob = TextBlob(text)
-            polarity = blob.sentiment.polarity
-            subjectivity = blob.sentiment.subjectivity
-            
-            # Classify sentiment
-            if polarity > 0.1:
-                sentiment = 'positive'
-                emoji = '😊'
-            elif polarity < -0.1:
-                sentiment = 'negative'
-                emoji = '😔'
-            else:
-                sentiment = 'neutral'
-                emoji = '😐'
-            
-            return {
-                'sentiment': sentiment,
-                'emoji': emoji,
-                'polarity': round(polarity, 2),
-                'subjectivity': round(subjectivity, 2),
-                'confidence': abs(polarity)
-            }
+            return classify(blob.sentiment.polarity, blob.sentiment.subjectivity)
         except Exception as e:
             print(f"Sentiment analysis error: {e}")
-            return {
-                'sentiment': 'neutral',
-                'emoji': '😐',
-                'polarity': 0,
-                'subjectivity': 0,
-                'confidence': 0
+            return dict(NEUTRAL_RESULT)
+    
+    def analyze_batch(self, texts: List[str]) -> List[Dict]:
+        """
+        Analyze many texts at once with the compiled lexicon; same results
+        as analyze_sentiment per text. Duplicate texts are scored once.
+        """
+        try:
+            unique = list(dict.fromkeys(texts))
+            polarity, subjectivity = get_lexicon().score(unique)
+            results = {
+                text: classify(float(p), float(s))
+                for text, p, s in zip(unique, polarity, subjectivity)
             }
+            return [dict(results[text]) for text in texts]
+        except Exception as e:
+            print(f"Batch sentiment analysis error: {e}")
+            return [dict(NEUTRAL_RESULT) for _ in texts]
     
-    def get_emotion_suggestions(self, sentiment: str) -> list:
-        """Get suggested responses based on sentiment"""
-        suggestions = {
-            'positive': [
-                "That's wonderful! 🎉",
-                "I'm so happy for you! 😊",
-                "Amazing news! ⭐"
-            ],
-            'negative': [
-                "I'm here for you 💙",
-                "That's tough, I understand 🤗",
-                "Sending you positive vibes ✨"
-            ],
-            'neutral': [
-                "Tell me more 💬",
-                "Interesting! 🤔",
-                "I see 👀"
-            ]
-        }
-        return suggestions.get(sentiment, [])
+    async def analyze_batch_async(self, texts: List[str]) -> List[Dict]:
+        """Analyze a batch in the process pool, split across the workers"""
+        if not self.use_process_pool or not texts:
+            return self.analyze_batch(texts)
+        pool = self._live_pool()
+        if pool is None:
+            self.stats['fallbacks'] += 1
+            return await asyncio.to_thread(self.analyze_batch, texts)
+        
+        size = -(-len(texts) // self.workers)
+        chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+        try:
+            loop = asyncio.get_event_loop()
+            results = await asyncio.gather(*[
+                loop.run_in_executor(pool, _analyze_batch_in_worker, chunk)
+                for chunk in chunks
+            ])
+            self.stats['analyzed'] += len(texts)
+            return [result for chunk in results for result in chunk]
+        except BrokenProcessPool as e:
+            self._discard_broken(pool, e)
+            self.stats['fallbacks'] += 1
+            return await asyncio.to_thread(self.analyze_batch, texts)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Batch sentiment analysis error: {e}")
+        return [dict(NEUTRAL_RESULT) for _ in texts]
+    
+    def get_emotion_suggestions(self, sentiment: str, language: str = 'english') -> list:
+        """Get suggested responses based on sentiment, from the precomputed localized table"""
+        prefix = f"suggestion.{sentiment}."
+        return [
+            localized_strings.get(key, language)
+            for key in SOURCE_STRINGS if key.startswith(prefix)
+        ]
 
 # Create singleton instance
-sentiment_service = SentimentService()
\ No newline at end of file
+sentiment_service = SentimentService(
+    workers=settings.SENTIMENT_WORKERS,
+    timeout=settings.SENTIMENT_TIMEOUT_SECONDS,
+    use_process_pool=settings.SENTIMENT_PROCESS_POOL
+)
\ No newline at end of file
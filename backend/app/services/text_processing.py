@@ -0,0 +1,126 @@
+import re
+from typing import List, Optional, Tuple
+
+# Sentence ends after danda, double danda, ?, ! or . followed by whitespace,
+# and at every line break
+_SENTENCE_BOUNDARY_RE = re.compile(r'((?<=[।॥?!.])\s+|\s*\n\s*)')
+
+def split_sentences(text: str) -> Tuple[List[str], List[str]]:
+    """
+    Split text into sentences on Indic-aware boundaries.
+    Returns (segments, separators) where separators[i] sits between
+    segments[i] and segments[i + 1], so join_segments() restores the layout.
+    """
+    parts = _SENTENCE_BOUNDARY_RE.split(text.strip())
+    return parts[0::2], parts[1::2]
+
+def join_segments(segments: List[str], separators: List[str]) -> str:
+    """Reassemble segments with their original separators"""
+    pieces = [segments[0]] if segments else []
+    for separator, segment in zip(separators, segments[1:]):
+        pieces.append(separator)
+        pieces.append(segment)
+    return ''.join(pieces)
+
+# Finer boundaries for sentences longer than a request may carry
+_CLAUSE_BOUNDARY_RE = re.compile(r'((?<=[,;:،؛])\s+)')
+_WORD_BOUNDARY_RE = re.compile(r'(\s+)')
+
+def _merge_parts(parts: List[str], separators: List[str], limit: int) -> Tuple[List[str], List[str]]:
+    """Greedily rejoin neighbouring parts while the result stays within limit"""
+    segments, kept = [parts[0]], []
+    for separator, part in zip(separators, parts[1:]):
+        if len(segments[-1]) + len(separator) + len(part) <= limit:
+            segments[-1] += separator + part
+        else:
+            kept.append(separator)
+            segments.append(part)
+    return segments, kept
+
+def split_long(text: str, limit: int, pack: bool = False) -> Tuple[List[str], List[str]]:
+    """
+    Split text into segments of at most limit characters: on paragraph and
+    sentence boundaries first, then clauses and words for overlong
+    sentences, with hard cuts only for unbroken runs. With pack, neighbouring
+    segments are rejoined while they fit, for the fewest requests. Returns
+    (segments, separators) like split_sentences().
+    """
+    segments, separators = split_sentences(text)
+    for pattern in (_CLAUSE_BOUNDARY_RE, _WORD_BOUNDARY_RE, None):
+        refined, refined_separators = [], []
+        for index, segment in enumerate(segments):
+            if index:
+                refined_separators.append(separators[index - 1])
+            if len(segment) <= limit:
+                refined.append(segment)
+                continue
+            if pattern is None:
+                parts = [segment[i:i + limit] for i in range(0, len(segment), limit)]
+                refined.extend(parts)
+                refined_separators.extend([''] * (len(parts) - 1))
+                continue
+            split = pattern.split(segment)
+            parts, between = _merge_parts(split[0::2], split[1::2], limit)
+            refined.extend(parts)
+            refined_separators.extend(between)
+        segments, separators = refined, refined_separators
+    if pack:
+        return _merge_parts(segments, separators, limit)
+    return segments, separators
+
+_EMOJI = r'[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF]'
+
+# Spans that must reach the reader unchanged: URLs, emails, @mentions,
+# phone numbers, other numbers and emoji sequences. Numbers only match as
+# whole tokens (not the 4 of "4pm"), and ZWJ / VS16 only inside an emoji
+# sequence, since Malayalam and Bengali words use ZWJ between letters.
+_PROTECTED_RE = re.compile(
+    r'(?:https?://|www\.)\S+'
+    r'|[\w.+-]+@[\w-]+\.[\w.-]+'
+    r'|@\w+'
+    r'|(?<!\w)\+?\d[\d\s().-]{5,}\d(?!\w)'
+    r'|(?<!\w)\d+(?:[.,:/]\d+)*(?!\w)'
+    rf'|{_EMOJI}(?:\uFE0F|\u200D?{_EMOJI})*'
+)
+_PLACEHOLDER_RE = re.compile(r'\{\s*(\d+)\s*\}')
+
+def mask_protected(text: str) -> Tuple[str, List[str]]:
+    """
+    Replace protected spans with stable {0}, {1}, ... placeholders so
+    template-shaped messages share one cache entry. Returns (masked, spans).
+    """
+    # Text that already looks like a placeholder cannot be masked safely
+    if _PLACEHOLDER_RE.search(text):
+        return text, []
+
+    spans = []
+
+    def replace(match):
+        spans.append(match.group(0))
+        return '{' + str(len(spans) - 1) + '}'
+
+    return _PROTECTED_RE.sub(replace, text), spans
+
+def restore_protected(text: str, spans: List[str]) -> Optional[str]:
+    """
+    Put protected spans back in place of their placeholders. Returns None
+    if the translation lost or duplicated a placeholder.
+    """
+    seen = []
+
+    def replace(match):
+        # int() also accepts digits the translator may have localized (e.g. ०, ௧)
+        index = int(match.group(1))
+        if index >= len(spans):
+            return match.group(0)
+        seen.append(index)
+        return spans[index]
+
+    restored = _PLACEHOLDER_RE.sub(replace, text)
+    if sorted(seen) != list(range(len(spans))):
+        return None
+    return restored
+
+def has_translatable_text(masked: str) -> bool:
+    """True if anything other than placeholders, punctuation and spaces is left"""
+    return any(ch.isalpha() for ch in _PLACEHOLDER_RE.sub('', masked))
@@ -0,0 +1,400 @@
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+import httpx
+from .http_translator import AsyncHTTPTranslator
+from .rate_limiter import (
+    UpstreamRateLimiter, AdaptiveConcurrencyLimiter, DailyQuotaStore, QuotaExceeded, Priority
+)
+from .translation_cache import normalize_text, resolve_db_path
+from .text_processing import split_long, join_segments
+
+class TranslationUnavailable(Exception):
+    """A backend cannot translate this input (not a health failure)"""
+    pass
+
+class AllBackendsFailed(Exception):
+    """Every backend in the chain failed or was skipped by its breaker"""
+    pass
+
+class TranslationBackend:
+    """Interface implemented by every translation backend"""
+    name = 'base'
+    # Whether calls go to a remote service (and get an adaptive concurrency limit)
+    remote = True
+    # Rate limit and daily quota of the upstream, for services that have one
+    limiter: Optional[UpstreamRateLimiter] = None
+    # Longest text one request may carry (None for no limit)
+    max_chars: Optional[int] = None
+
+    async def translate(self, text: str, source_code: str, target_code: str) -> str:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    def get_stats(self) -> Dict:
+        return {}
+
+class HTTPBackend(TranslationBackend):
+    """Pooled async HTTP client for Google or MyMemory"""
+    def __init__(self, name: str, translator: AsyncHTTPTranslator, max_chars: Optional[int] = None,
+                 limiter: Optional[UpstreamRateLimiter] = None):
+        self.name = name
+        self.translator = translator
+        self.max_chars = max_chars
+        self.limiter = limiter
+
+    async def translate(self, text: str, source_code: str, target_code: str) -> str:
+        return await self.translator.translate(text, source_code, target_code)
+
+    async def close(self):
+        await self.translator.aclose()
+
+    def get_stats(self) -> Dict:
+        return self.translator.get_stats()
+
+class DeepTranslatorBackend(TranslationBackend):
+    """deep-translator's GoogleTranslator on the default executor"""
+    name = 'deep_translator'
+    max_chars = 5000
+
+    async def translate(self, text: str, source_code: str, target_code: str) -> str:
+        from deep_translator import GoogleTranslator
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: GoogleTranslator(source=source_code, target=target_code).translate(text)
+        )
+
+class OfflineBackend(TranslationBackend):
+    """
+    Network-free phrase table covering common chat phrases in every
+    supported language. Raises TranslationUnavailable for unknown text.
+    """
+    name = 'offline'
+    remote = False
+    _TRAILING_PUNCTUATION_RE = re.compile(r'[\s.!?।॥؟]+$')
+
+    def __init__(self, phrases_path: str):
+        # (match key, source code) -> phrase group index
+        self._index: Dict[Tuple[str, str], int] = {}
+        # phrase group index -> {code: canonical phrase}
+        self._groups: List[Dict[str, str]] = []
+        self.stats = {'hits': 0, 'misses': 0}
+        self._load(phrases_path)
+
+    def _match_key(self, text: str) -> str:
+        return self._TRAILING_PUNCTUATION_RE.sub('', normalize_text(text).casefold())
+
+    def _load(self, phrases_path: str):
+        try:
+            with open(phrases_path, encoding='utf-8') as f:
+                groups = json.load(f)
+        except Exception as e:
+            print(f"Offline phrase table not loaded: {e}")
+            return
+
+        for group in groups:
+            canonical = {}
+            group_id = len(self._groups)
+            for code, variants in group.items():
+                if isinstance(variants, str):
+                    variants = [variants]
+                canonical[code] = variants[0]
+                for variant in variants:
+                    self._index.setdefault((self._match_key(variant), code), group_id)
+            self._groups.append(canonical)
+
+    async def translate(self, text: str, source_code: str, target_code: str) -> str:
+        group_id = self._index.get((self._match_key(text), source_code))
+        if group_id is None or target_code not in self._groups[group_id]:
+            self.stats['misses'] += 1
+            raise TranslationUnavailable("Phrase not in offline table")
+        self.stats['hits'] += 1
+        return self._groups[group_id][target_code]
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'phrases': len(self._groups)}
+
+class CircuitBreaker:
+    """
+    Per-backend breaker. Closed passes calls through; after enough
+    consecutive failures it opens and rejects calls immediately; once the
+    recovery timeout passes it goes half-open and lets one trial call decide.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, recovery_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self.stats = {'rejected': 0, 'opened': 0}
+
+    def allow(self) -> bool:
+        """Return True if a call may go through now"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_seconds:
+                self.stats['rejected'] += 1
+                return False
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                self.stats['rejected'] += 1
+                return False
+            self._trial_in_flight = True
+
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.stats['opened'] += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """End a trial call that neither succeeded nor failed"""
+        self._trial_in_flight = False
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'state': self.state, 'failures': self.failures}
+
+class BackendChain:
+    """
+    Ordered fallback chain. Each backend sits behind its own circuit
+    breaker and timeout, so an unhealthy upstream fails fast and the next
+    backend (ending with the offline table) gets the request.
+    """
+    # Upstream replies that mean "slow down"
+    OVERLOAD_STATUS_CODES = (429, 503)
+
+    def __init__(self, backends: List[TranslationBackend], failure_threshold: int = 5,
+                 recovery_seconds: float = 30.0, timeout: Optional[float] = None,
+                 concurrency: Optional[Dict] = None, split_concurrency: int = 4):
+        self.backends = backends
+        self.timeout = timeout
+        # Pieces of one split text in flight at once
+        self.split_concurrency = split_concurrency
+        # Adaptive (AIMD) concurrency limit per upstream backend
+        self.concurrency = {
+            backend.name: AdaptiveConcurrencyLimiter(**concurrency)
+            for backend in backends if backend.remote
+        } if concurrency is not None else {}
+        self.breakers = {
+            backend.name: CircuitBreaker(failure_threshold, recovery_seconds)
+            for backend in backends
+        }
+        self.served = {backend.name: 0 for backend in backends}
+        # Texts sent in pieces because they exceeded a backend's max_chars
+        self.split = {backend.name: {'texts': 0, 'pieces': 0} for backend in backends}
+
+    def _is_overload(self, error: Exception) -> bool:
+        if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException)):
+            return True
+        return getattr(error, 'status_code', None) in self.OVERLOAD_STATUS_CODES
+
+    async def _call(self, backend: TranslationBackend, text: str, source_code: str,
+                    target_code: str, priority: Priority) -> str:
+        """One concurrency- and rate-limited request with the backend timeout"""
+        # Queue for the rate token first, so the concurrency limit only
+        # counts requests actually in flight upstream
+        if backend.limiter is not None:
+            await backend.limiter.acquire(priority)
+
+        concurrency = self.concurrency.get(backend.name)
+        if concurrency is not None:
+            await concurrency.acquire(priority)
+
+        latency_ms = None
+        overloaded = False
+        try:
+            started = time.perf_counter()
+            translation = await asyncio.wait_for(
+                backend.translate(text, source_code, target_code),
+                timeout=self.timeout
+            )
+            latency_ms = (time.perf_counter() - started) * 1000
+            return translation
+        except Exception as e:
+            overloaded = self._is_overload(e)
+            raise
+        finally:
+            if concurrency is not None:
+                concurrency.release(latency_ms, overloaded)
+
+    async def _call_split(self, backend: TranslationBackend, text: str, source_code: str,
+                          target_code: str, priority: Priority) -> str:
+        """
+        Send text over the backend's limit in as few pieces as fit, a few at
+        a time, and reassemble them in order. Every piece is its own upstream
+        request, so each takes a rate token and counts against the daily
+        quota; the rest are not sent once one fails.
+        """
+        segments, separators = split_long(text, backend.max_chars, pack=True)
+        self.split[backend.name]['texts'] += 1
+        self.split[backend.name]['pieces'] += len(segments)
+
+        # Don't spend part of the budget on a text that can't be finished today
+        if backend.limiter is not None:
+            backend.limiter.check_budget(priority, len(segments))
+
+        gate = asyncio.Semaphore(self.split_concurrency)
+        failed = []
+
+        async def send(segment: str) -> str:
+            async with gate:
+                if failed:
+                    raise failed[0]
+                try:
+                    return await self._call(backend, segment, source_code, target_code, priority)
+                except Exception as e:
+                    failed.append(e)
+                    raise
+
+        results = await asyncio.gather(*[send(segment) for segment in segments], return_exceptions=True)
+        if failed:
+            raise failed[0]
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return join_segments(list(results), separators)
+
+    async def translate(self, text: str, source_code: str, target_code: str,
+                        priority: Priority = Priority.LIVE) -> str:
+        errors = []
+
+        for backend in self.backends:
+            breaker = self.breakers[backend.name]
+            if not breaker.allow():
+                errors.append(f"{backend.name}: circuit open")
+                continue
+
+            try:
+                if backend.max_chars and len(text) > backend.max_chars:
+                    translation = await self._call_split(backend, text, source_code, target_code, priority)
+                else:
+                    translation = await self._call(backend, text, source_code, target_code, priority)
+            except (QuotaExceeded, TranslationUnavailable) as e:
+                breaker.release()
+                errors.append(f"{backend.name}: {e}")
+                continue
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as e:
+                breaker.record_failure()
+                errors.append(f"{backend.name}: {str(e) or type(e).__name__}")
+                continue
+
+            breaker.record_success()
+            self.served[backend.name] += 1
+            return translation
+
+        raise AllBackendsFailed('; '.join(errors) or "No translation backends configured")
+
+    async def close(self):
+        for backend in self.backends:
+            await backend.close()
+
+    def get_stats(self) -> Dict:
+        return {
+            backend.name: {
+                'served': self.served[backend.name],
+                'split': self.split[backend.name],
+                'concurrency': self.concurrency[backend.name].get_stats() if backend.name in self.concurrency else None,
+                'breaker': self.breakers[backend.name].get_stats(),
+                'quota': backend.limiter.get_stats() if backend.limiter is not None else None,
+                **backend.get_stats()
+            }
+            for backend in self.backends
+        }
+
+def build_quota_store(settings) -> Optional[DailyQuotaStore]:
+    """Daily quota counts shared by the workers on this host, if configured"""
+    db_path = resolve_db_path(settings.TRANSLATION_QUOTA_DB_PATH)
+    if not db_path:
+        return None
+    try:
+        return DailyQuotaStore(db_path)
+    except Exception as e:
+        print(f"Translation quota store disabled, counting per process: {e}")
+        return None
+
+def build_backend_chain(settings) -> BackendChain:
+    """Build the fallback chain from the comma-separated TRANSLATION_BACKENDS setting"""
+    http_options = dict(
+        max_connections=settings.TRANSLATION_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.TRANSLATION_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.TRANSLATION_HTTP_KEEPALIVE_SECONDS,
+        timeout=settings.TRANSLATION_HTTP_TIMEOUT_SECONDS
+    )
+    store = build_quota_store(settings)
+
+    def limiter(name: str, daily_quota: int) -> Optional[UpstreamRateLimiter]:
+        # Upstreams without a quota are only bounded by the adaptive concurrency limit
+        if not daily_quota:
+            return None
+        return UpstreamRateLimiter(
+            daily_quota=daily_quota,
+            rate_per_second=settings.TRANSLATION_RATE_PER_SECOND,
+            burst=settings.TRANSLATION_RATE_BURST,
+            manual_reserve=settings.TRANSLATION_QUOTA_RESERVE_MANUAL,
+            background_reserve=settings.TRANSLATION_QUOTA_RESERVE_BACKGROUND,
+            name=name,
+            store=store
+        )
+
+    backends = []
+    for name in [n.strip() for n in settings.TRANSLATION_BACKENDS.split(',') if n.strip()]:
+        if name == 'google_http':
+            backends.append(HTTPBackend(name, AsyncHTTPTranslator(
+                'google', settings.GOOGLE_TRANSLATE_URL, **http_options
+            ), max_chars=settings.GOOGLE_TRANSLATE_MAX_CHARS,
+                limiter=limiter(name, settings.GOOGLE_TRANSLATE_DAILY_QUOTA)))
+        elif name == 'mymemory_http':
+            backends.append(HTTPBackend(name, AsyncHTTPTranslator(
+                'mymemory', settings.MYMEMORY_URL, email=settings.MYMEMORY_EMAIL or None, **http_options
+            ), max_chars=settings.MYMEMORY_MAX_CHARS,
+                limiter=limiter(name, settings.MYMEMORY_DAILY_QUOTA)))
+        elif name == 'deep_translator':
+            backends.append(DeepTranslatorBackend())
+        elif name == 'offline':
+            backends.append(OfflineBackend(
+                os.path.join(os.path.dirname(__file__), '../data/offline_phrases.json')
+            ))
+        else:
+            print(f"Unknown translation backend ignored: {name}")
+
+    return BackendChain(
+        backends,
+        failure_threshold=settings.TRANSLATION_BREAKER_FAILURES,
+        recovery_seconds=settings.TRANSLATION_BREAKER_RECOVERY_SECONDS,
+        timeout=settings.TRANSLATION_BACKEND_TIMEOUT_SECONDS,
+        split_concurrency=settings.TRANSLATION_SPLIT_CONCURRENCY,
+        concurrency=dict(
+            initial_limit=settings.TRANSLATION_AIMD_INITIAL_LIMIT,
+            min_limit=settings.TRANSLATION_AIMD_MIN_LIMIT,
+            max_limit=settings.TRANSLATION_AIMD_MAX_LIMIT,
+            latency_target_ms=settings.TRANSLATION_AIMD_LATENCY_TARGET_MS,
+            backoff=settings.TRANSLATION_AIMD_BACKOFF
+        ) if settings.TRANSLATION_AIMD_ENABLED else None
+    )
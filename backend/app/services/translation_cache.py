@@ -0,0 +1,251 @@
+import asyncio
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, Dict, List
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache keys (Unicode NFC + whitespace folding)"""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+class TranslationCache:
+    """
+    Two-tier translation cache: a bounded in-process LRU in front of a
+    persistent SQLite store that survives restarts.
+    Keys are (normalized text, source code, target code). The LRU is only
+    used from the event loop; the SQLite store is only used from one worker
+    thread, and new entries are queued and committed in batches.
+    """
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 0,
+                 db_path: Optional[str] = None, max_db_entries: int = 0,
+                 flush_delay: float = 0.5):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_db_entries = max_db_entries
+        self.flush_delay = flush_delay
+
+        self._memory: "OrderedDict[Tuple[str, str, str], Tuple[str, float]]" = OrderedDict()
+        self._db = None
+        self._db_writes = 0
+        # Entries not yet written to the disk store: key -> (translation, created_at)
+        self._pending: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'disk_batches': 0,
+            'disk_pruned': 0
+        }
+
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str):
+        try:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS translations ('
+                'text TEXT NOT NULL, source TEXT NOT NULL, target TEXT NOT NULL, '
+                'translation TEXT NOT NULL, created_at REAL NOT NULL, '
+                'PRIMARY KEY (text, source, target))'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS idx_translations_created ON translations (created_at)')
+            self._db.commit()
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='translation-cache')
+        except Exception as e:
+            print(f"Translation cache disk store disabled: {e}")
+            self._db = None
+
+    async def _on_db_thread(self, function, *args):
+        """Run a disk store operation on the cache's worker thread"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _key(self, text: str, source_code: str, target_code: str) -> Tuple[str, str, str]:
+        return (normalize_text(text), source_code, target_code)
+
+    def _expires_at(self, created_at: float) -> float:
+        return created_at + self.ttl_seconds if self.ttl_seconds > 0 else float('inf')
+
+    def _remember(self, key: Tuple[str, str, str], translation: str, expires_at: float):
+        """Insert into the LRU tier"""
+        self._memory[key] = (translation, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _read_db(self, key: Tuple[str, str, str]) -> Optional[Tuple[str, float]]:
+        try:
+            return self._db.execute(
+                'SELECT translation, created_at FROM translations '
+                'WHERE text = ? AND source = ? AND target = ?',
+                key
+            ).fetchone()
+        except Exception as e:
+            print(f"Translation cache read error: {e}")
+            return None
+
+    async def get(self, text: str, source_code: str, target_code: str) -> Optional[str]:
+        """Look up a translation, checking memory first and then the disk store"""
+        key = self._key(text, source_code, target_code)
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            translation, expires_at = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return translation
+            del self._memory[key]
+            self.stats['expirations'] += 1
+
+        if self._db is not None:
+            row = self._pending.get(key) or await self._on_db_thread(self._read_db, key)
+            if row is not None:
+                translation, created_at = row
+                expires_at = self._expires_at(created_at)
+                if expires_at > now:
+                    self._remember(key, translation, expires_at)
+                    self.stats['disk_hits'] += 1
+                    return translation
+                self.stats['expirations'] += 1
+
+        self.stats['misses'] += 1
+        return None
+
+    def set(self, text: str, source_code: str, target_code: str, translation: str):
+        """Store a translation in memory and queue it for the disk store"""
+        key = self._key(text, source_code, target_code)
+        now = time.time()
+
+        self._remember(key, translation, self._expires_at(now))
+        self.stats['writes'] += 1
+
+        if self._db is not None:
+            self._pending[key] = (translation, now)
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flusher is not None and not self._flusher.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts): write through
+            self._write_db(self._take_pending())
+            return
+        self._flusher = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        # Entries queued while a batch is being written go in the next one
+        while self._pending:
+            await asyncio.sleep(self.flush_delay)
+            await self.flush()
+
+    def _take_pending(self) -> List[Tuple[str, str, str, str, float]]:
+        rows = [(*key, translation, created_at) for key, (translation, created_at) in self._pending.items()]
+        self._pending.clear()
+        return rows
+
+    async def flush(self):
+        """Write every queued entry to the disk store in one transaction"""
+        if self._db is None or not self._pending:
+            return
+        await self._on_db_thread(self._write_db, self._take_pending())
+
+    def _write_db(self, rows: List[Tuple[str, str, str, str, float]]):
+        """Commit a batch of entries (runs on the worker thread)"""
+        if not rows:
+            return
+        try:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO translations '
+                '(text, source, target, translation, created_at) VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+            self._db.commit()
+            self.stats['disk_batches'] += 1
+            previous = self._db_writes
+            self._db_writes += len(rows)
+            if self.max_db_entries and self._db_writes // 1000 > previous // 1000:
+                self._prune_db()
+        except Exception as e:
+            print(f"Translation cache write error: {e}")
+
+    def _prune_db(self):
+        """Drop expired rows and the oldest rows beyond the size limit (runs on the worker thread)"""
+        if self.ttl_seconds > 0:
+            cursor = self._db.execute(
+                'DELETE FROM translations WHERE created_at < ?',
+                (time.time() - self.ttl_seconds,)
+            )
+            self.stats['disk_pruned'] += cursor.rowcount
+
+        count = self._db.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+        overflow = count - self.max_db_entries
+        if overflow > 0:
+            cursor = self._db.execute(
+                'DELETE FROM translations WHERE rowid IN '
+                '(SELECT rowid FROM translations ORDER BY created_at LIMIT ?)',
+                (overflow,)
+            )
+            self.stats['disk_pruned'] += cursor.rowcount
+        self._db.commit()
+
+    def _clear_db(self):
+        self._db.execute('DELETE FROM translations')
+        self._db.commit()
+
+    async def clear(self):
+        """Remove every cached translation from both tiers"""
+        self._memory.clear()
+        self._pending.clear()
+        if self._db is not None:
+            await self._on_db_thread(self._clear_db)
+
+    async def close(self):
+        """Write queued entries and close the disk store"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if self._db is None:
+            return
+        await self.flush()
+        db, self._db = self._db, None
+        await asyncio.get_running_loop().run_in_executor(self._executor, db.close)
+        self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict:
+        """Return hit/miss/eviction counters and current sizes"""
+        lookups = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['misses']
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        return {
+            **self.stats,
+            'memory_entries': len(self._memory),
+            'pending_writes': len(self._pending),
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'disk_enabled': self._db is not None
+        }
+
+def resolve_db_path(db_path: str) -> Optional[str]:
+    """Resolve a configured cache path relative to the backend directory"""
+    if not db_path:
+        return None
+    if os.path.isabs(db_path):
+        return db_path
+    return os.path.join(os.path.dirname(__file__), '../..', db_path)
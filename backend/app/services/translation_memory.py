@@ -0,0 +1,256 @@
+import math
+import re
+import threading
+from array import array
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+from .translation_cache import normalize_text
+
+# Punctuation and symbols; combining marks (Indic vowel signs, Arabic
+# harakat) are not \w but belong to their word, so they are kept
+_NON_WORD_RE = re.compile(r'[^\w\s\u0300-\u036f\u064b-\u065f\u0670\u0900-\u0963\u0966-\u0dff]+')
+_REPEAT_RE = re.compile(r'(\w)\1{2,}')
+_TRAILING_RE = re.compile(r'[\W_]*$')
+
+# Words that turn a sentence into its opposite, per fuzzy key token
+# ("don't" keys as "don t"); a text only matches texts with the same ones
+NEGATIONS = frozenset(
+    'not no never nothing nobody none nor neither cannot t dont cant wont isnt arent wasnt '
+    'werent doesnt didnt hasnt havent hadnt shouldnt wouldnt couldnt mustnt '
+    'nahi nahin nhi mat '
+    'नहीं न ना मत नाही नको نہیں نہ مت இல்லை வேண்டாம் அல்ல లేదు కాదు వద్దు ಇಲ್ಲ ಬೇಡ ಅಲ್ಲ '
+    'ഇല്ല അല്ല വേണ്ട না নয় নেই নি নহয় নাই નથી ના નહીં ન ਨਹੀਂ ਨਾ ਮਤ ନାହିଁ ନୁହେଁ ନା'.split()
+)
+
+def fuzzy_key(text: str) -> str:
+    """Fold case, punctuation and stretched letters ("goood!!" -> "good")"""
+    key = _NON_WORD_RE.sub(' ', normalize_text(text).casefold())
+    key = _REPEAT_RE.sub(r'\1\1', key)
+    return ' '.join(key.split())
+
+def meaning_signature(text: str, key: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    The parts of a text fuzzy matching must not ignore: whether it ends as
+    a question or an exclamation, and its negation words in order
+    """
+    trailing = _TRAILING_RE.search(text).group()
+    mark = '?' if any(c in trailing for c in '?؟？') else '!' if any(c in trailing for c in '!！') else ''
+    return mark, tuple(word for word in key.split() if word in NEGATIONS)
+
+class _PairIndex:
+    """Entries and n-gram postings for one (source, target, meaning signature) group"""
+    def __init__(self):
+        # entry id -> (fuzzy key, gram ids, translation); the tuple shares the
+        # vocabulary's int objects, so it is as small as an array and faster to intersect
+        self.entries: Dict[int, Tuple[str, Tuple[int, ...], str]] = {}
+        self.exact: Dict[str, int] = {}
+        # (gram id, gram count) packed into one int -> entry ids
+        self.postings: Dict[int, array] = {}
+        self.gram_frequency: Dict[int, int] = {}
+        self.stale = 0
+
+class TranslationMemory:
+    """
+    Fuzzy translation memory for near-duplicate messages. Past
+    (source, translation) pairs are indexed per language pair and meaning
+    signature (question mark, negations) with a character n-gram inverted
+    index, bucketed by n-gram count so the Jaccard length bound and prefix
+    filter keep lookups to a few postings. Memory is bounded by
+    max_entries (oldest entries are evicted first).
+    """
+    MAX_GRAMS = 127
+    # Postings read beyond the prefix to filter candidates by count
+    EXTRA_LISTS = 3
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 200000,
+                 max_chars: int = 120, n: int = 3, max_postings: int = 2000,
+                 max_candidates: int = 200):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_postings = max_postings
+        self.max_candidates = max_candidates
+        self.max_chars = max_chars
+        self.n = n
+
+        self._pairs: Dict[Tuple, _PairIndex] = {}
+        self._order: deque = deque()
+        self._vocabulary: Dict[str, int] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'lookups': 0,
+            'exact_hits': 0,
+            'fuzzy_hits': 0,
+            'misses': 0,
+            'over_budget': 0,
+            'evictions': 0,
+            'similarity_sum': 0.0
+        }
+
+    def _grams(self, key: str, create: bool) -> List[int]:
+        padded = f" {key} "
+        grams = {padded[i:i + self.n] for i in range(len(padded) - self.n + 1)}
+        ids = []
+        for gram in grams:
+            gram_id = self._vocabulary.get(gram)
+            if gram_id is None:
+                if not create:
+                    # Unknown gram: cannot be shared with any entry, but still counts
+                    ids.append(-1 - len(ids))
+                    continue
+                gram_id = len(self._vocabulary)
+                self._vocabulary[gram] = gram_id
+            ids.append(gram_id)
+        return ids
+
+    def add(self, text: str, source_code: str, target_code: str, translation: str):
+        """Remember a translation for future fuzzy lookups"""
+        key = fuzzy_key(text)
+        if not key or len(key) > self.max_chars:
+            return
+
+        with self._lock:
+            pair_key = (source_code, target_code, meaning_signature(text, key))
+            pair = self._pairs.setdefault(pair_key, _PairIndex())
+            existing = pair.exact.get(key)
+            if existing is not None:
+                old_key, grams, _ = pair.entries[existing]
+                pair.entries[existing] = (old_key, grams, translation)
+                return
+
+            grams = self._grams(key, create=True)
+            if len(grams) > self.MAX_GRAMS:
+                return
+
+            entry_id = self._next_id
+            self._next_id += 1
+            pair.entries[entry_id] = (key, tuple(grams), translation)
+            pair.exact[key] = entry_id
+            size = len(grams)
+            for gram_id in grams:
+                pair.postings.setdefault(gram_id * 128 + size, array('l')).append(entry_id)
+                pair.gram_frequency[gram_id] = pair.gram_frequency.get(gram_id, 0) + 1
+
+            self._order.append((pair_key, entry_id))
+            while len(self._order) > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """Drop the oldest entry (caller holds the lock)"""
+        pair_key, entry_id = self._order.popleft()
+        pair = self._pairs[pair_key]
+        key, grams, _ = pair.entries.pop(entry_id)
+        pair.exact.pop(key, None)
+        for gram_id in grams:
+            pair.gram_frequency[gram_id] -= 1
+        self.stats['evictions'] += 1
+
+        # Postings keep stale ids until they outnumber live entries
+        pair.stale += 1
+        if pair.stale > len(pair.entries):
+            self._compact(pair)
+
+    def _compact(self, pair: _PairIndex):
+        live = pair.entries
+        pair.postings = {
+            posting_key: array('l', (i for i in ids if i in live))
+            for posting_key, ids in pair.postings.items()
+        }
+        pair.postings = {k: v for k, v in pair.postings.items() if v}
+        pair.stale = 0
+
+    def lookup(self, text: str, source_code: str, target_code: str) -> Optional[Tuple[str, float]]:
+        """Return (translation, similarity) for the best match above the threshold"""
+        key = fuzzy_key(text)
+        with self._lock:
+            self.stats['lookups'] += 1
+            pair = self._pairs.get((source_code, target_code, meaning_signature(text, key)))
+            if not key or pair is None or len(key) > self.max_chars:
+                self.stats['misses'] += 1
+                return None
+
+            entry_id = pair.exact.get(key)
+            if entry_id is not None:
+                self.stats['exact_hits'] += 1
+                self.stats['similarity_sum'] += 1.0
+                return pair.entries[entry_id][2], 1.0
+
+            best = self._best_match(pair, self._grams(key, create=False))
+            if best is None:
+                self.stats['misses'] += 1
+                return None
+
+            translation, similarity = best
+            self.stats['fuzzy_hits'] += 1
+            self.stats['similarity_sum'] += similarity
+            return translation, similarity
+
+    def _best_match(self, pair: _PairIndex, query: List[int]) -> Optional[Tuple[str, float]]:
+        t = self.threshold
+        m = len(query)
+        smallest = max(1, math.ceil(t * m))
+        largest = min(self.MAX_GRAMS, math.floor(m / t))
+
+        # Any entry reaching the threshold shares one of the rarest
+        # (m - min_overlap + 1) query grams, so only their postings must be read
+        min_overlap = math.ceil(t * (m + smallest) / (1 + t))
+        prefix_length = max(m - min_overlap + 1, 0)
+        # Unknown grams (negative ids) sort first: they match nothing and cost nothing
+        ordered = sorted(query, key=lambda g: pair.gram_frequency.get(g, 0))
+
+        # Read further postings while they fit the budget; every extra list
+        # read raises the number of lists a real match must appear in
+        postings = []
+        scanned = 0
+        used = 0
+        for gram_id in ordered:
+            base = gram_id * 128
+            gram_postings = [ids for ids in (pair.postings.get(base + size) for size in range(smallest, largest + 1)) if ids]
+            length = sum(len(ids) for ids in gram_postings)
+            if used < prefix_length and scanned + length > self.max_postings:
+                # Short texts made only of very common grams would need a scan of
+                # huge postings; treat them as misses to keep lookups bounded
+                self.stats['over_budget'] += 1
+                return None
+            if used >= prefix_length and (used >= prefix_length + self.EXTRA_LISTS
+                                          or scanned + length > self.max_postings):
+                break
+            postings.extend(gram_postings)
+            scanned += length
+            used += 1
+
+        counts = Counter()
+        for ids in postings:
+            counts.update(ids)
+        required = max(min_overlap - (m - used), 1)
+        candidates = [entry_id for entry_id, count in counts.items() if count >= required]
+        if len(candidates) > self.max_candidates:
+            self.stats['over_budget'] += 1
+            return None
+
+        query_set = set(query)
+        best = None
+        best_similarity = t
+        for entry_id in candidates:
+            entry = pair.entries.get(entry_id)
+            if entry is None:
+                continue
+            grams = entry[1]
+            overlap = len(query_set.intersection(grams))
+            similarity = overlap / (m + len(grams) - overlap)
+            if similarity >= best_similarity:
+                best = (entry[2], similarity)
+                best_similarity = similarity
+        return best
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            hits = self.stats['exact_hits'] + self.stats['fuzzy_hits']
+            return {
+                **{k: v for k, v in self.stats.items() if k != 'similarity_sum'},
+                'entries': len(self._order),
+                'pairs': len({pair_key[:2] for pair_key in self._pairs}),
+                'avg_hit_similarity': round(self.stats['similarity_sum'] / hits, 4) if hits else 0.0,
+                'threshold': self.threshold
+            }
@@ -1,30 +1,80 @@
-from deep_translator import GoogleTranslator
-from langdetect import detect
 import asyncio
-from typing import Dict
+import time
+from typing import Dict, List
+from ..core.config import settings
+from ..core.singleflight import SingleFlight
+from .translation_cache import TranslationCache, resolve_db_path, normalize_text
+from .translation_backends import build_backend_chain
+from .translation_memory import TranslationMemory
+from .rate_limiter import Priority
+from .text_processing import (
+    split_long, join_segments, mask_protected, restore_protected, has_translatable_text
+)
+from .language_detector import script_detector, RestrictedLangDetector
+from .languages import LANGUAGE_CODES, LANGUAGE_NAMES
 
 class TranslationService:
+    # Separator used to pack several short texts into one upstream request
+    BATCH_DELIMITER = '\n'
+    
     def __init__(self):
         # Language mapping for display names to codes
-        self.language_map = {
-            'hindi': 'hi',
-            'tamil': 'ta',
-            'telugu': 'te',
-            'bengali': 'bn',
-            'marathi': 'mr',
-            'gujarati': 'gu',
-            'kannada': 'kn',
-            'malayalam': 'ml',
-            'punjabi': 'pa',
-            'odia': 'or',
-            'english': 'en',
-            'urdu': 'ur',
-            'assamese': 'as',
-            'sanskrit': 'sa'
-        }
+        self.language_map = dict(LANGUAGE_CODES)
         
         # Reverse mapping for code to name
-        self.code_to_language = {v: k for k, v in self.language_map.items()}
+        self.code_to_language = dict(LANGUAGE_NAMES)
+        
+        # Seeded langdetect restricted to our languages, built once
+        self.langdetector = RestrictedLangDetector(
+            self.language_map.values(),
+            seed=settings.LANGDETECT_SEED,
+            memo_size=settings.LANGDETECT_MEMO_SIZE
+        )
+        
+        # Two-tier cache shared by single, detected and batch translation
+        self.cache = TranslationCache(
+            max_entries=settings.TRANSLATION_CACHE_SIZE,
+            ttl_seconds=settings.TRANSLATION_CACHE_TTL_SECONDS,
+            db_path=resolve_db_path(settings.TRANSLATION_CACHE_DB_PATH),
+            max_db_entries=settings.TRANSLATION_CACHE_DB_MAX_ENTRIES
+        )
+        
+        # Fuzzy memory for near-duplicates that miss the exact cache
+        self.memory = TranslationMemory(
+            threshold=settings.TRANSLATION_MEMORY_THRESHOLD,
+            max_entries=settings.TRANSLATION_MEMORY_MAX_ENTRIES
+        ) if settings.TRANSLATION_MEMORY_ENABLED else None
+        
+        # Identical in-flight requests share one upstream call
+        self.translate_flights = SingleFlight()
+        self.detect_flights = SingleFlight()
+        
+        # Ordered backend chain with per-backend circuit breakers
+        self.backends = build_backend_chain(settings)
+        
+        # Pairs translated through the pivot language instead of directly
+        self.pivot_code = settings.TRANSLATION_PIVOT_LANGUAGE
+        self.pivot_pairs = {
+            tuple(pair.strip().split('-', 1))
+            for pair in settings.TRANSLATION_PIVOT_PAIRS.split(',')
+            if '-' in pair
+        }
+        
+        self.stats = {
+            'masked': 0,
+            'skipped_untranslatable': 0,
+            'restore_failures': 0,
+            'pivoted': 0
+        }
+        
+        # Upstream chunks of batches and long messages
+        self.chunk_stats = {
+            'chunks': 0,
+            'retries': 0,
+            'failed': 0,
+            'total_latency_ms': 0.0,
+            'max_latency_ms': 0.0
+        }
     
     def get_language_code(self, language: str) -> str:
         """Convert language name to code"""
@@ -34,18 +84,109 @@ class TranslationService:
         """Convert language code to name"""
         return self.code_to_language.get(code.lower(), code)
     
-    def detect_language(self, text: str) -> str:
+    def canonical_language(self, language: str) -> str:
+        """Normalize a language name or code to its lowercase display name"""
+        return self.get_language_name(self.get_language_code(language))
+    
+    async def detect_language(self, text: str) -> str:
         """Detect language from text and return language name"""
         try:
-            detected_code = detect(text)
+            # Most scripts identify the language outright
+            language, script = script_detector.classify(text)
+            if language:
+                return language
+            
+            detected_code = self.langdetector.cached(text)
+            if detected_code is None:
+                default_code = 'hi' if script == 'devanagari' else 'en'
+                loop = asyncio.get_event_loop()
+                detected_code = await self.detect_flights.do(
+                    normalize_text(text),
+                    lambda: loop.run_in_executor(None, self.langdetector.detect, text, default_code)
+                )
             return self.get_language_name(detected_code)
         except Exception as e:
             print(f"Language detection error: {e}")
             return 'english'
     
-    async def translate_text(self, text: str, source_lang: str, target_lang: str) -> str:
+    async def _translate_upstream(self, text: str, source_code: str, target_code: str,
+                                  priority: Priority = Priority.LIVE) -> str:
+        """Call the upstream translator; raises on failure so errors are never cached"""
+        return await self.backends.translate(text, source_code, target_code, priority)
+    
+    async def _recall(self, text: str, source_code: str, target_code: str):
+        """Exact cache first, then the fuzzy translation memory"""
+        cached = await self.cache.get(text, source_code, target_code)
+        if cached is not None or self.memory is None:
+            return cached
+        
+        # Not written back to the cache: a fuzzy hit is another text's
+        # translation and must never become this text's exact entry
+        match = self.memory.lookup(text, source_code, target_code)
+        return match[0] if match is not None else None
+    
+    def _remember(self, text: str, source_code: str, target_code: str, translation: str):
+        """Store a fresh upstream translation in the cache and the translation memory"""
+        self.cache.set(text, source_code, target_code, translation)
+        if self.memory is not None:
+            self.memory.add(text, source_code, target_code, translation)
+    
+    def is_supported(self, code: str) -> bool:
+        return code in self.code_to_language
+    
+    def seed(self, text: str, source_code: str, target_code: str, translation: str) -> bool:
+        """
+        Store a translation obtained elsewhere, e.g. one saved on a message.
+        Rejected unless both codes are supported and it differs from the
+        text: failed translations used to be saved as the original text.
+        """
+        if source_code == target_code or not (self.is_supported(source_code) and self.is_supported(target_code)):
+            return False
+        if not translation or normalize_text(translation) == normalize_text(text):
+            return False
+        self._remember(text, source_code, target_code, translation)
+        return True
+    
+    def _pivots(self, source_code: str, target_code: str) -> bool:
+        """Whether this pair is configured to go through the pivot language"""
+        if not self.pivot_pairs or self.pivot_code in (source_code, target_code):
+            return False
+        candidates = [(source_code, target_code), (source_code, '*'), ('*', target_code), ('*', '*')]
+        return any(pair in self.pivot_pairs for pair in candidates)
+    
+    async def _translate_cached(self, text: str, source_code: str, target_code: str,
+                                priority: Priority = Priority.LIVE) -> str:
+        """Serve a translation from the cache, falling back to the upstream on a miss"""
+        if self._pivots(source_code, target_code):
+            # Both hops are cached, so fan-out to more targets reuses the pivot
+            self.stats['pivoted'] += 1
+            pivot = await self._translate_cached(text, source_code, self.pivot_code, priority)
+            return await self._translate_cached(pivot, self.pivot_code, target_code, priority)
+        
+        cached = await self._recall(text, source_code, target_code)
+        if cached is not None:
+            return cached
+        
+        async def fetch():
+            translation = await self._translate_upstream(text, source_code, target_code, priority)
+            if translation:
+                self._remember(text, source_code, target_code, translation)
+            return translation
+        
+        # Join a call in flight at this priority or a more urgent one; a live
+        # message never waits behind a background call's queueing or shedding
+        key = (normalize_text(text), source_code, target_code)
+        for urgent in Priority:
+            if urgent > priority:
+                break
+            if self.translate_flights.in_flight(key + (urgent,)):
+                return await self.translate_flights.do(key + (urgent,), fetch)
+        return await self.translate_flights.do(key + (priority,), fetch)
+    
+    async def translate_text(self, text: str, source_lang: str, target_lang: str,
+                             priority: Priority = Priority.LIVE) -> str:
         """
-        Translate text using deep-translator (Google Translate API)
+        Translate text through the cache and the backend fallback chain
         """
         try:
             # Convert language names to codes
@@ -56,28 +197,73 @@ class TranslationService:
             if source_code == target_code:
                 return text
             
-            # Run translation in executor to avoid blocking
-            loop = asyncio.get_event_loop()
-            translation = await loop.run_in_executor(
-                None,
-                lambda: GoogleTranslator(source=source_code, target=target_code).translate(text)
-            )
-            
-            return translation
+            return await self._translate_masked(text, source_code, target_code, priority)
             
         except Exception as e:
             print(f"Translation error: {e}")
             # Return original text if translation fails
             return text
     
-    async def translate_with_detection(self, text: str, target_lang: str) -> Dict[str, str]:
+    async def _translate_masked(self, text: str, source_code: str, target_code: str,
+                                priority: Priority) -> str:
+        """
+        Swap URLs, mentions, numbers and emoji for placeholders before
+        translating, so template-shaped messages share cache entries and
+        messages with nothing translatable never reach the upstream.
+        """
+        masked, spans = mask_protected(text)
+        if not has_translatable_text(masked):
+            self.stats['skipped_untranslatable'] += 1
+            return text
+        
+        if not spans:
+            return await self._translate_plain(text, source_code, target_code, priority)
+        
+        self.stats['masked'] += 1
+        translated = await self._translate_plain(masked, source_code, target_code, priority)
+        restored = restore_protected(translated, spans)
+        if restored is not None:
+            return restored
+        
+        # The upstream mangled a placeholder; translate the raw text instead
+        self.stats['restore_failures'] += 1
+        return await self._translate_plain(text, source_code, target_code, priority)
+    
+    async def _translate_plain(self, text: str, source_code: str, target_code: str,
+                               priority: Priority) -> str:
+        """
+        Translate text as one cached unit, or sentence by sentence if it has
+        several; sentences over the request limit are split further
+        """
+        segments, separators = split_long(text, settings.TRANSLATION_BATCH_CHAR_LIMIT)
+        if len(segments) <= 1:
+            return await self._translate_cached(text, source_code, target_code, priority)
+        
+        return await self._translate_segments(segments, separators, source_code, target_code, priority)
+    
+    async def _translate_segments(self, segments: List[str], separators: List[str],
+                                  source_code: str, target_code: str, priority: Priority) -> str:
+        """
+        Translate a multi-sentence message segment by segment, so common
+        sentences hit the cache; only missing segments go upstream, in one batch.
+        """
+        results = await self._translate_many(segments, source_code, target_code, priority)
+        
+        errors = [result['error'] for result in results if result['error']]
+        if errors:
+            raise Exception(errors[0])
+        
+        return join_segments([result['translated_text'] for result in results], separators)
+    
+    async def translate_with_detection(self, text: str, target_lang: str,
+                                       priority: Priority = Priority.LIVE) -> Dict[str, str]:
         """Detect source language and translate to target language"""
         try:
             # Detect source language
-            source_lang = self.detect_language(text)
+            source_lang = await self.detect_language(text)
             
             # Translate text
-            translated_text = await self.translate_text(text, source_lang, target_lang)
+            translated_text = await self.translate_text(text, source_lang, target_lang, priority)
             
             return {
                 'original_text': text,
@@ -94,29 +280,266 @@ class TranslationService:
                 'target_language': target_lang
             }
     
-    async def translate_batch(self, texts: list, source_lang: str, target_lang: str) -> list:
-        """Translate multiple texts at once"""
-        try:
-            source_code = self.get_language_code(source_lang)
-            target_code = self.get_language_code(target_lang)
-            
-            if source_code == target_code:
-                return texts
+    async def translate_to_languages(self, text: str, target_langs: List[str],
+                                     priority: Priority = Priority.LIVE) -> Dict:
+        """
+        Detect the source language once, then translate into each distinct
+        target language concurrently. Returns the source language and a
+        {language name: translated text} map with one entry per target.
+        """
+        source_lang = await self.detect_language(text)
+        
+        # One upstream translation per distinct language, however it was spelled
+        languages = list(dict.fromkeys(self.canonical_language(lang) for lang in target_langs))
+        
+        translated = await asyncio.gather(*[
+            self.translate_text(text, source_lang, language, priority)
+            for language in languages
+        ])
+        
+        return {
+            'original_text': text,
+            'source_language': source_lang,
+            'translations': dict(zip(languages, translated))
+        }
+    
+    def _pack_chunks(self, texts: List[str]) -> List[List[str]]:
+        """
+        Group texts into chunks that fit in one upstream request when joined
+        by the batch delimiter. Texts containing the delimiter go alone.
+        """
+        limit = settings.TRANSLATION_BATCH_CHAR_LIMIT
+        delimiter = self.BATCH_DELIMITER
+        chunks = []
+        current = []
+        current_size = 0
+        
+        for text in texts:
+            if delimiter in text or len(text) >= limit:
+                chunks.append([text])
+                continue
             
-            loop = asyncio.get_event_loop()
-            translations = []
+            added = len(text) + (len(delimiter) if current else 0)
+            if current and current_size + added > limit:
+                chunks.append(current)
+                current = []
+                current_size = 0
+                added = len(text)
             
-            for text in texts:
-                translation = await loop.run_in_executor(
-                    None,
-                    lambda t=text: GoogleTranslator(source=source_code, target=target_code).translate(t)
+            current.append(text)
+            current_size += added
+        
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    async def _with_retries(self, call):
+        """Run an upstream call, retrying failures up to TRANSLATION_CHUNK_RETRIES times"""
+        for attempt in range(settings.TRANSLATION_CHUNK_RETRIES + 1):
+            try:
+                return await call()
+            except Exception:
+                if attempt == settings.TRANSLATION_CHUNK_RETRIES:
+                    raise
+                self.chunk_stats['retries'] += 1
+    
+    async def _translate_chunk(self, chunk: List[str], source_code: str, target_code: str,
+                               priority: Priority) -> List[Dict]:
+        """Translate one chunk and record its latency"""
+        started = time.perf_counter()
+        try:
+            results = await self._translate_chunk_items(chunk, source_code, target_code, priority)
+        finally:
+            latency = (time.perf_counter() - started) * 1000
+            self.chunk_stats['chunks'] += 1
+            self.chunk_stats['total_latency_ms'] += latency
+            self.chunk_stats['max_latency_ms'] = max(self.chunk_stats['max_latency_ms'], latency)
+        self.chunk_stats['failed'] += sum(1 for result in results if result['error'])
+        return results
+    
+    async def _translate_chunk_items(self, chunk: List[str], source_code: str, target_code: str,
+                                     priority: Priority) -> List[Dict]:
+        """Translate one packed chunk, falling back to per-item calls if unpacking fails"""
+        if len(chunk) > 1:
+            try:
+                packed = await self._with_retries(lambda: self._translate_upstream(
+                    self.BATCH_DELIMITER.join(chunk), source_code, target_code, priority
+                ))
+                parts = [part.strip() for part in packed.split(self.BATCH_DELIMITER)] if packed else []
+                # A blank line means an item was lost, the same as a count mismatch
+                if len(parts) == len(chunk) and all(parts):
+                    results = []
+                    for text, part in zip(chunk, parts):
+                        self._remember(text, source_code, target_code, part)
+                        results.append({'translated_text': part, 'error': None})
+                    return results
+            except Exception as e:
+                print(f"Packed batch translation error, retrying per item: {e}")
+        
+        async def single(text: str) -> Dict:
+            try:
+                translation = await self._with_retries(
+                    lambda: self._translate_cached(text, source_code, target_code, priority)
                 )
-                translations.append(translation)
+                return {'translated_text': translation or text, 'error': None}
+            except Exception as e:
+                return {'translated_text': text, 'error': str(e)}
+        
+        return list(await asyncio.gather(*[single(text) for text in chunk]))
+    
+    async def translate_batch_results(self, texts: List[str], source_lang: str, target_lang: str,
+                                      priority: Priority = Priority.BACKGROUND) -> List[Dict]:
+        """
+        Translate multiple texts, reporting the outcome of each item.
+        Duplicates are translated once, cache hits skip the upstream, short
+        misses are packed into shared requests and chunks run concurrently.
+        Returns one {'original_text', 'translated_text', 'error'} per input, in order.
+        """
+        source_code = self.get_language_code(source_lang)
+        target_code = self.get_language_code(target_lang)
+        
+        if source_code == target_code:
+            return [{'original_text': t, 'translated_text': t, 'error': None} for t in texts]
+        
+        # Mask protected spans; items with nothing translatable skip the upstream
+        masked = [mask_protected(text) for text in texts]
+        pending = [m for m, spans in masked if has_translatable_text(m)]
+        translated = iter(await self._translate_many(pending, source_code, target_code, priority))
+        
+        results = []
+        retry = []
+        for text, (m, spans) in zip(texts, masked):
+            if not has_translatable_text(m):
+                self.stats['skipped_untranslatable'] += 1
+                results.append({'original_text': text, 'translated_text': text, 'error': None})
+                continue
             
-            return translations
+            result = next(translated)
+            if spans:
+                self.stats['masked'] += 1
+                restored = restore_protected(result['translated_text'], spans) if not result['error'] else text
+                if restored is None:
+                    self.stats['restore_failures'] += 1
+                    retry.append(len(results))
+                    restored = text
+                result = {**result, 'translated_text': restored}
+            results.append({**result, 'original_text': text})
+        
+        if retry:
+            retried = await self._translate_many([texts[i] for i in retry], source_code, target_code, priority)
+            for index, result in zip(retry, retried):
+                results[index] = result
+        
+        return results
+    
+    async def _translate_many(self, texts: List[str], source_code: str, target_code: str,
+                              priority: Priority) -> List[Dict]:
+        """Batch engine shared by translate_batch_results and segmented translation"""
+        if self._pivots(source_code, target_code):
+            return await self._translate_many_pivoted(texts, source_code, target_code, priority)
+        
+        # De-duplicate on the normalized form, remembering where each input maps
+        outcomes: Dict[str, Dict] = {}
+        misses = []
+        for text in texts:
+            key = normalize_text(text)
+            if key in outcomes:
+                continue
+            if not has_translatable_text(key):
+                outcomes[key] = {'translated_text': text, 'error': None}
+                continue
+            cached = await self._recall(text, source_code, target_code)
+            if cached is not None:
+                outcomes[key] = {'translated_text': cached, 'error': None}
+            else:
+                outcomes[key] = None
+                misses.append(text)
+        
+        semaphore = asyncio.Semaphore(settings.TRANSLATION_BATCH_CONCURRENCY)
+        
+        async def run(chunk: List[str]) -> List[Dict]:
+            async with semaphore:
+                return await self._translate_chunk(chunk, source_code, target_code, priority)
+        
+        chunks = self._pack_chunks(misses)
+        chunk_results = await asyncio.gather(*[run(chunk) for chunk in chunks], return_exceptions=True)
+        
+        for chunk, results in zip(chunks, chunk_results):
+            if isinstance(results, BaseException):
+                results = [{'translated_text': t, 'error': str(results)} for t in chunk]
+            for text, result in zip(chunk, results):
+                outcomes[normalize_text(text)] = result
+        
+        return [
+            {'original_text': text, **outcomes[normalize_text(text)]}
+            for text in texts
+        ]
+    
+    async def _translate_many_pivoted(self, texts: List[str], source_code: str, target_code: str,
+                                      priority: Priority) -> List[Dict]:
+        """Batch through the pivot language; items failing the first hop keep their error"""
+        self.stats['pivoted'] += len(texts)
+        first = await self._translate_many(texts, source_code, self.pivot_code, priority)
+        
+        ok = [index for index, result in enumerate(first) if not result['error']]
+        second = await self._translate_many(
+            [first[index]['translated_text'] for index in ok], self.pivot_code, target_code, priority
+        )
+        
+        results = [{**result, 'original_text': text} for text, result in zip(texts, first)]
+        for index, result in zip(ok, second):
+            results[index] = {
+                'original_text': texts[index],
+                'translated_text': result['translated_text'] if not result['error'] else texts[index],
+                'error': result['error']
+            }
+        return results
+    
+    async def translate_batch(self, texts: list, source_lang: str, target_lang: str,
+                              priority: Priority = Priority.BACKGROUND) -> list:
+        """Translate multiple texts at once; failed items keep their original text"""
+        try:
+            results = await self.translate_batch_results(texts, source_lang, target_lang, priority)
+            for result in results:
+                if result['error']:
+                    print(f"Batch translation error for item: {result['error']}")
+            return [result['translated_text'] for result in results]
         except Exception as e:
             print(f"Batch translation error: {e}")
             return texts
+    
+    async def close(self):
+        """Release pooled upstream connections and write out the cache"""
+        await self.backends.close()
+        await self.cache.close()
+    
+    def get_stats(self) -> Dict:
+        """Return translation pipeline metrics"""
+        return {
+            'cache': self.cache.get_stats(),
+            'memory': self.memory.get_stats() if self.memory else None,
+            'masking': {k: v for k, v in self.stats.items() if k != 'pivoted'},
+            'chunks': {
+                **self.chunk_stats,
+                'avg_latency_ms': round(self.chunk_stats['total_latency_ms'] / self.chunk_stats['chunks'], 2)
+                if self.chunk_stats['chunks'] else 0.0
+            },
+            'pivot': {
+                'language': self.pivot_code,
+                'pairs': sorted('-'.join(pair) for pair in self.pivot_pairs),
+                'pivoted': self.stats['pivoted']
+            },
+            'backends': self.backends.get_stats(),
+            'quota': {
+                backend.name: backend.limiter.get_stats()
+                for backend in self.backends.backends if backend.limiter is not None
+            },
+            'detection': self.langdetector.get_stats(),
+            'coalescing': {
+                'translate': self.translate_flights.get_stats(),
+                'detect': self.detect_flights.get_stats()
+            }
+        }
 
 # Create singleton instance
 translation_service = TranslationService()
\ No newline at end of file
@@ -0,0 +1,273 @@
+"""
+Concurrent FirebaseService calls: do Firestore round trips overlap or
+queue behind each other? Runs the same mix of requests (user lookups,
+message pages, message writes) through FirebaseService twice:
+
+- blocking: every RPC blocks the event loop, as the synchronous
+  firestore.client() did
+- async: every RPC awaits, as with the AsyncClient
+
+Against the Firestore emulator when FIRESTORE_EMULATOR_HOST is set
+(the blocking run then uses the synchronous client on the same emulator),
+otherwise against an in-memory fake with a fixed latency per RPC. A
+ticker records event-loop lag, which is what Socket.IO traffic sees.
+
+    cd backend
+    python -m benchmarks.firestore_concurrency [concurrent requests] [rpc latency ms]
+"""
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+# The module-level singleton is built at import and needs credentials or an
+# emulator address; the fake run never sends anything to this address
+EMULATOR = os.environ.get('FIRESTORE_EMULATOR_HOST')
+os.environ.setdefault('FIRESTORE_EMULATOR_HOST', 'localhost:8080')
+
+from app.services.firebase_service import FirebaseService
+
+class FakeSnapshot:
+    def __init__(self, data):
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+class FakeFirestore:
+    """In-memory subset of the Firestore client API used by FirebaseService"""
+    def __init__(self, latency: float, blocking: bool):
+        self.latency = latency
+        self.blocking = blocking
+        self.collections = {}
+        self.rpcs = 0
+
+    async def rpc(self):
+        self.rpcs += 1
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+
+    def collection(self, name):
+        return FakeQuery(self, self.collections.setdefault(name, {}))
+
+    def batch(self):
+        return FakeBatch(self)
+
+class FakeDocument:
+    def __init__(self, client, docs, doc_id):
+        self.client = client
+        self.docs = docs
+        self.id = doc_id
+
+    async def get(self):
+        await self.client.rpc()
+        return FakeSnapshot(self.docs.get(self.id))
+
+    async def set(self, data):
+        await self.client.rpc()
+        self.docs[self.id] = dict(data)
+
+    async def update(self, fields):
+        await self.client.rpc()
+        apply_update(self.docs[self.id], fields)
+
+def apply_update(doc, fields):
+    for path, value in fields.items():
+        *parents, leaf = path.split('.')
+        target = doc
+        for key in parents:
+            target = target.setdefault(key, {}) or {}
+        target[leaf] = value
+
+class FakeQuery:
+    def __init__(self, client, docs, filters=(), order=None, count=None, after=None):
+        self.client = client
+        self.docs = docs
+        self.filters = filters
+        self.order = order
+        self.count = count
+        self.after = after
+
+    def _with(self, **changes):
+        fields = {'filters': self.filters, 'order': self.order, 'count': self.count, 'after': self.after}
+        return FakeQuery(self.client, self.docs, **{**fields, **changes})
+
+    def document(self, doc_id=None):
+        return FakeDocument(self.client, self.docs, doc_id or uuid.uuid4().hex[:20])
+
+    def where(self, field, op, value):
+        return self._with(filters=self.filters + ((field, op, value),))
+
+    def order_by(self, field, direction='ASCENDING'):
+        return self._with(order=(field, direction == 'DESCENDING'))
+
+    def limit(self, count):
+        return self._with(count=count)
+
+    def start_after(self, values):
+        return self._with(after=values)
+
+    def _matches(self, doc):
+        for field, op, value in self.filters:
+            if op == '==' and doc.get(field) != value:
+                return False
+            if op == 'array_contains' and value not in (doc.get(field) or []):
+                return False
+        return True
+
+    def _run(self):
+        docs = [doc for doc in self.docs.values() if self._matches(doc)]
+        if self.order:
+            field, descending = self.order
+            docs.sort(key=lambda doc: doc.get(field), reverse=descending)
+            if self.after:
+                edge = self.after[field]
+                docs = [doc for doc in docs if (doc.get(field) < edge if descending else doc.get(field) > edge)]
+        return [FakeSnapshot(doc) for doc in docs[:self.count]]
+
+    async def get(self):
+        await self.client.rpc()
+        return self._run()
+
+    async def stream(self):
+        await self.client.rpc()
+        for snapshot in self._run():
+            yield snapshot
+
+class FakeBatch:
+    def __init__(self, client):
+        self.client = client
+        self.writes = []
+
+    def set(self, ref, data):
+        self.writes.append(lambda: ref.docs.__setitem__(ref.id, dict(data)))
+
+    def update(self, ref, fields):
+        self.writes.append(lambda: apply_update(ref.docs[ref.id], fields))
+
+    async def commit(self):
+        await self.client.rpc()
+        for write in self.writes:
+            write()
+
+class BlockingEmulatorClient:
+    """The synchronous client on the emulator, behind awaitable wrappers"""
+    def __init__(self):
+        from google.cloud import firestore
+        self.db = firestore.Client(project=os.environ.get('GCLOUD_PROJECT', 'demo-local-language'))
+
+    def collection(self, name):
+        return Awaitables(self.db.collection(name))
+
+    def batch(self):
+        return BlockingBatch(self.db.batch())
+
+class Awaitables:
+    """Wraps a sync Firestore object so its RPCs can be awaited, but still block"""
+    BLOCKING = ('get', 'set', 'update', 'commit')
+    CHAINED = ('collection', 'document', 'where', 'order_by', 'limit', 'start_after')
+
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if name in self.BLOCKING:
+            async def call(*args, **kwargs):
+                return attribute(*args, **kwargs)
+            return call
+        if name in self.CHAINED:
+            return lambda *args, **kwargs: Awaitables(attribute(*args, **kwargs))
+        if name == 'stream':
+            async def stream(*args, **kwargs):
+                for item in attribute(*args, **kwargs):
+                    yield item
+            return stream
+        return attribute
+
+def unwrap(value):
+    return value._target if isinstance(value, Awaitables) else value
+
+class BlockingBatch(Awaitables):
+    def set(self, ref, data):
+        self._target.set(unwrap(ref), data)
+
+    def update(self, ref, fields):
+        self._target.update(unwrap(ref), fields)
+
+async def seed(service: FirebaseService, users: int, conversation_id: str):
+    for index in range(users):
+        await service.db.collection('users').document(f"user-{index}").set({
+            'id': f"user-{index}", 'email': f"user{index}@example.com", 'preferred_language': 'hindi'
+        })
+    for index in range(20):
+        await service.create_message({
+            'conversation_id': conversation_id, 'sender_id': 'user-0', 'text': f"message {index}",
+            'timestamp': index, 'read': False
+        })
+
+async def request_mix(service: FirebaseService, index: int, conversation_id: str):
+    """One chat request's worth of Firestore work"""
+    await service.get_user_by_id(f"user-{index % 10}")
+    await service.get_messages(conversation_id, limit=20)
+    await service.create_message({
+        'conversation_id': conversation_id, 'sender_id': f"user-{index % 10}", 'text': 'hi',
+        'timestamp': 1000 + index, 'read': False
+    })
+
+async def measure(service: FirebaseService, concurrency: int, conversation_id: str):
+    lags = []
+    stop = False
+
+    async def ticker():
+        while not stop:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append((time.perf_counter() - started) * 1000 - 1)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    await asyncio.gather(*[request_mix(service, index, conversation_id) for index in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    stop = True
+    await tick
+
+    lags.sort()
+    return {
+        'elapsed_ms': elapsed * 1000,
+        'requests_per_s': concurrency / elapsed,
+        'lag_p99_ms': lags[max(int(len(lags) * 0.99) - 1, 0)] if lags else 0.0,
+        'lag_max_ms': lags[-1] if lags else 0.0
+    }
+
+def report(name, result):
+    print(f"{name:<9} {result['elapsed_ms']:8.0f} ms   {result['requests_per_s']:8.0f} req/s"
+          f"   loop lag p99 {result['lag_p99_ms']:7.1f} ms   max {result['lag_max_ms']:7.1f} ms")
+
+async def main(concurrency: int = 100, latency_ms: float = 5.0):
+    conversation_id = f"bench-{uuid.uuid4().hex[:8]}"
+
+    if EMULATOR:
+        print(f"Firestore emulator at {EMULATOR}")
+        blocking = FirebaseService(db=BlockingEmulatorClient())
+        native = FirebaseService()
+    else:
+        print(f"In-memory fake, {latency_ms:g} ms per RPC")
+        blocking = FirebaseService(db=FakeFirestore(latency_ms / 1000, blocking=True))
+        native = FirebaseService(db=FakeFirestore(latency_ms / 1000, blocking=False))
+
+    print(f"{concurrency} concurrent requests, 3 Firestore round trips each")
+    for name, service in (('blocking', blocking), ('async', native)):
+        await seed(service, 10, conversation_id)
+        report(name, await measure(service, concurrency, conversation_id))
+
+if __name__ == '__main__':
+    args = [float(arg) for arg in sys.argv[1:3]]
+    if args:
+        args[0] = int(args[0])
+    asyncio.run(main(*args))
@@ -0,0 +1,150 @@
+"""
+AsyncHTTPTranslator against local stubs, no network needed:
+
+- httpx.MockTransport injected as the transport: Google and MyMemory
+  reply parsing, error statuses and transport timeouts
+- a keep-alive HTTP/1.1 stub server on localhost: per-request timeouts
+  and connection reuse across many concurrent requests
+
+Every check asserts; the pool section also reports throughput.
+
+    cd backend
+    python -m benchmarks.http_translator [requests] [max connections]
+"""
+import asyncio
+import json
+import socket
+import sys
+import time
+from urllib.parse import urlsplit, parse_qs
+import httpx
+from app.services.http_translator import AsyncHTTPTranslator, TranslationHTTPError
+
+def stub_reply(path: str, query: dict):
+    """(status, JSON body) the stubs send for one request"""
+    text = query.get('q', [''])[0]
+    if text == 'status 429':
+        return 429, {}
+    if path == '/translate_a/single':
+        target = query['tl'][0]
+        if text == 'malformed':
+            return 200, {'unexpected': True}
+        # gtx splits the reply into sentence segments
+        return 200, [[[f"[{target}] {part}", part, None] for part in text.split('|')], None, query['sl'][0]]
+    if path == '/get':
+        target = query['langpair'][0].split('|')[1]
+        if text == 'quota':
+            return 200, {'responseStatus': 403, 'responseDetails': 'MYMEMORY WARNING: YOU USED ALL AVAILABLE FREE TRANSLATIONS'}
+        if text == 'empty':
+            return 200, {'responseStatus': 200, 'responseData': {'translatedText': ''}}
+        return 200, {'responseStatus': 200, 'responseData': {'translatedText': f"[{target}] {text}"}}
+    return 404, {}
+
+def mock_handler(request: httpx.Request) -> httpx.Response:
+    if request.url.params.get('q') == 'hang':
+        raise httpx.ReadTimeout("stub timeout", request=request)
+    if request.url.params.get('q') == 'html':
+        return httpx.Response(200, text='<html>Service unavailable</html>')
+    status, body = stub_reply(request.url.path, parse_qs(request.url.query.decode()))
+    return httpx.Response(status, json=body)
+
+async def expect_error(call, error_type, status_code=None):
+    try:
+        await call
+    except error_type as e:
+        assert status_code is None or e.status_code == status_code, e
+        return
+    raise AssertionError(f"expected {error_type.__name__}")
+
+async def check_parsing():
+    google = AsyncHTTPTranslator('google', 'http://stub', transport=httpx.MockTransport(mock_handler))
+    mymemory = AsyncHTTPTranslator('mymemory', 'http://stub', email='dev@example.com',
+                                   transport=httpx.MockTransport(mock_handler))
+
+    assert await google.translate('hello|world', 'en', 'hi') == '[hi] hello[hi] world'
+    await expect_error(google.translate('malformed', 'en', 'hi'), TranslationHTTPError)
+    await expect_error(google.translate('html', 'en', 'hi'), TranslationHTTPError)
+    await expect_error(google.translate('status 429', 'en', 'hi'), TranslationHTTPError, 429)
+    await expect_error(google.translate('hang', 'en', 'hi'), httpx.TimeoutException)
+
+    assert await mymemory.translate('hello', 'en', 'ta') == '[ta] hello'
+    await expect_error(mymemory.translate('quota', 'en', 'ta'), TranslationHTTPError, 403)
+    await expect_error(mymemory.translate('empty', 'en', 'ta'), TranslationHTTPError)
+    await expect_error(mymemory.translate('html', 'en', 'ta'), TranslationHTTPError)
+    await expect_error(mymemory.translate('status 429', 'en', 'ta'), TranslationHTTPError, 429)
+
+    assert google.stats['timeouts'] == 1 and google.stats['errors'] == 4
+    assert mymemory.stats['errors'] == 4 and mymemory.stats['in_flight'] == 0
+    await google.aclose()
+    await mymemory.aclose()
+    print("parsing        google and mymemory replies, errors and timeouts ok")
+
+class StubServer:
+    """Keep-alive HTTP/1.1 server answering like the upstream endpoints"""
+    def __init__(self, delay: float = 0.005):
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                target = head.split(b' ', 2)[1].decode()
+                url = urlsplit(target)
+                query = parse_qs(url.query)
+                self.requests += 1
+
+                await asyncio.sleep(1.0 if query.get('q') == ['slow'] else self.delay)
+                status, body = stub_reply(url.path, query)
+                payload = json.dumps(body).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\nConnection: keep-alive\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # Client went away, or the stub is shutting down mid-reply
+            pass
+        finally:
+            writer.close()
+
+async def check_pool(requests: int, max_connections: int):
+    stub = StubServer()
+    server = await asyncio.start_server(stub.handle, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+
+    translator = AsyncHTTPTranslator('google', f"http://127.0.0.1:{port}", max_connections=max_connections,
+                                     max_keepalive_connections=max_connections, timeout=30.0)
+
+    await expect_error(translator.translate('slow', 'en', 'hi', timeout=0.2), httpx.TimeoutException)
+    assert translator.stats['timeouts'] == 1
+    print("timeout        per-request timeout raised after 0.2 s, counted in stats")
+
+    connections_before = stub.connections
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        translator.translate(f"message {i}", 'en', 'hi') for i in range(requests)
+    ])
+    elapsed = time.perf_counter() - started
+    opened = stub.connections - connections_before
+
+    assert results == [f"[hi] message {i}" for i in range(requests)]
+    assert opened <= max_connections, opened
+    assert translator.stats['peak_in_flight'] <= requests
+
+    await translator.aclose()
+    server.close()
+    await server.wait_closed()
+    print(f"pool           {requests} requests over {opened} connections "
+          f"(limit {max_connections}), {requests / elapsed:.0f} req/s")
+
+async def main(requests: int = 500, max_connections: int = 10):
+    await check_parsing()
+    await check_pool(requests, max_connections)
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*args))
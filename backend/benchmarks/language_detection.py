@@ -0,0 +1,96 @@
+"""
+Compare the script fast path and the restricted, seeded langdetect engine
+against plain per-call detect().
+
+    cd backend
+    python -m benchmarks.language_detection
+"""
+import asyncio
+import json
+import os
+import time
+from langdetect import detect
+from app.services.translation_service import translation_service
+from app.services.language_detector import script_detector
+
+PHRASES_PATH = os.path.join(os.path.dirname(__file__), '../app/data/offline_phrases.json')
+
+EXTRA_SAMPLES = [
+    ('hindi', 'मुझे कल सुबह दफ्तर जाना है और शाम को बाजार भी जाना है।'),
+    ('marathi', 'मला उद्या सकाळी ऑफिसला जायचे आहे आणि संध्याकाळी बाजारात जायचे आहे.'),
+    ('english', 'I need to go to the office tomorrow morning and to the market in the evening.'),
+    ('tamil', 'நான் நாளை காலை அலுவலகத்திற்கு செல்ல வேண்டும்.'),
+    ('bengali', 'আমাকে কাল সকালে অফিসে যেতে হবে।'),
+    ('urdu', 'مجھے کل صبح دفتر جانا ہے۔'),
+]
+
+def load_samples():
+    with open(PHRASES_PATH, encoding='utf-8') as f:
+        groups = json.load(f)
+
+    samples = list(EXTRA_SAMPLES)
+    for group in groups:
+        for code, variants in group.items():
+            if isinstance(variants, str):
+                variants = [variants]
+            for variant in variants:
+                samples.append((translation_service.get_language_name(code), variant))
+    return samples
+
+def plain_detect(text):
+    try:
+        return translation_service.get_language_name(detect(text))
+    except Exception:
+        return 'english'
+
+def run(name, fn, samples, rounds):
+    correct = sum(1 for language, text in samples if fn(text) == language)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for _, text in samples:
+            fn(text)
+    elapsed = time.perf_counter() - started
+    calls = rounds * len(samples)
+    print(f"{name:<28} {calls / elapsed:>10.0f} msg/s   accuracy {correct}/{len(samples)}")
+
+def main(rounds: int = 20):
+    samples = load_samples()
+    loop = asyncio.new_event_loop()
+
+    def fast_path(text):
+        return loop.run_until_complete(translation_service.detect_language(text))
+
+    resolved = [(language, text) for language, text in samples if script_detector.detect(text)]
+    print(f"{len(samples)} samples, {len(resolved)} resolved by script alone\n")
+
+    print("All samples")
+    run('langdetect detect()', plain_detect, samples, rounds)
+    run('script fast path + fallback', fast_path, samples, rounds)
+
+    print("\nScript-resolvable samples")
+    run('langdetect detect()', plain_detect, resolved, rounds)
+    run('script fast path', fast_path, resolved, rounds)
+    run('script histogram only', script_detector.detect, resolved, rounds)
+
+    engine = translation_service.langdetector
+    ambiguous = [(language, text) for language, text in samples if not script_detector.detect(text)]
+
+    def restricted_cold(text):
+        engine._memo.clear()
+        return translation_service.get_language_name(engine.detect(text))
+
+    def restricted_memoized(text):
+        return translation_service.get_language_name(engine.detect(text))
+
+    print("\nAmbiguous (Devanagari/Latin) samples")
+    run('langdetect detect()', plain_detect, ambiguous, rounds)
+    run('restricted engine, cold', restricted_cold, ambiguous, rounds)
+    run('restricted engine, memoized', restricted_memoized, ambiguous, rounds)
+
+    plain_changes = sum(1 for _, text in ambiguous if plain_detect(text) != plain_detect(text))
+    engine_changes = sum(1 for _, text in ambiguous if restricted_cold(text) != restricted_cold(text))
+    print(f"\nResults that changed between two runs: detect() {plain_changes}, restricted engine {engine_changes}")
+    loop.close()
+
+if __name__ == '__main__':
+    main()
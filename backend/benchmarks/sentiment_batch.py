@@ -0,0 +1,58 @@
+"""
+Batch sentiment throughput: one TextBlob call per message versus
+SentimentService.analyze_batch on the compiled lexicon, over a synthetic
+history. Also checks that every result matches the per-message path.
+
+    cd backend
+    python -m benchmarks.sentiment_batch [messages] [distinct texts]
+"""
+import random
+import sys
+import time
+from app.services.sentiment_service import SentimentService
+from app.services.sentiment_lexicon import get_lexicon
+
+WORDS = ("good bad happy sad great terrible wonderful awful nice poor love hate the a I it is "
+         "meeting tomorrow office really very not never quite dinner movie friend thanks ok").split()
+PUNCTUATION = ["", "", "", ".", "!", "?", "!!", " :)", ", really"]
+
+def make_history(count: int, distinct: int, seed: int = 0):
+    rng = random.Random(seed)
+    texts = [
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 30))) + rng.choice(PUNCTUATION)
+        for _ in range(distinct)
+    ]
+    # Chat history repeats itself ("ok", "thanks!"), skewed towards a few texts
+    return [texts[int(distinct * rng.random() ** 3)] for _ in range(count)]
+
+def main(count: int = 20000, distinct: int = 5000):
+    history = make_history(count, distinct)
+    service = SentimentService(use_process_pool=False)
+
+    started = time.perf_counter()
+    get_lexicon()
+    print(f"lexicon compiled in {(time.perf_counter() - started) * 1000:.0f} ms ({len(get_lexicon())} words)")
+
+    started = time.perf_counter()
+    expected = [service.analyze_sentiment(text) for text in history]
+    per_message = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = service.analyze_batch(history)
+    batch = time.perf_counter() - started
+
+    unique = list(dict.fromkeys(history))
+    started = time.perf_counter()
+    get_lexicon().score(unique)
+    scoring = time.perf_counter() - started
+
+    mismatches = sum(1 for a, b in zip(expected, results) if a != b)
+    print(f"{count} messages, {len(unique)} distinct")
+    print(f"per-message TextBlob {count / per_message:10.0f} msg/s")
+    print(f"analyze_batch        {count / batch:10.0f} msg/s   ({per_message / batch:.0f}x)")
+    print(f"  distinct texts     {len(unique) / scoring:10.0f} texts/s (tokenizing + vectorized scoring)")
+    print(f"mismatches: {mismatches}")
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,74 @@
+"""
+Event-loop lag while many messages are scored for sentiment at once:
+TextBlob called inline on the loop versus the pre-warmed process pool.
+A ticker sleeps 1 ms in a loop and records how late each wake-up is,
+which is the delay every Socket.IO connection sees.
+
+    cd backend
+    python -m benchmarks.sentiment_event_loop [concurrent sends] [rounds]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+from app.services.sentiment_service import SentimentService
+
+WORDS = ("good bad happy sad great terrible wonderful awful nice poor love hate "
+         "the a meeting tomorrow office really very not quite dinner movie friend").split()
+
+def make_messages(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 60))) for _ in range(count)]
+
+async def measure(analyze, messages, rounds: int):
+    lags = []
+    stop = False
+
+    async def ticker():
+        while not stop:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append((time.perf_counter() - started) * 1000 - 1)
+
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*[analyze(text) for text in messages])
+    elapsed = time.perf_counter() - started
+    stop = True
+    await tick
+
+    lags.sort()
+    return {
+        'messages_per_s': len(messages) * rounds / elapsed,
+        'lag_p50_ms': statistics.median(lags),
+        'lag_p99_ms': lags[int(len(lags) * 0.99) - 1],
+        'lag_max_ms': lags[-1]
+    }
+
+def report(name, result):
+    print(f"{name:<14} {result['messages_per_s']:8.0f} msg/s   lag p50 {result['lag_p50_ms']:6.2f} ms"
+          f"   p99 {result['lag_p99_ms']:7.2f} ms   max {result['lag_max_ms']:7.2f} ms")
+
+async def main(concurrency: int = 50, rounds: int = 20):
+    messages = make_messages(concurrency)
+
+    inline = SentimentService(use_process_pool=False)
+
+    async def analyze_inline(text):
+        # What send_message did before: a synchronous call on the loop
+        return inline.analyze_sentiment(text)
+
+    pooled = SentimentService(workers=2, timeout=5.0)
+    await pooled.warm_up()
+
+    print(f"{concurrency} concurrent sends x {rounds} rounds")
+    report('inline', await measure(analyze_inline, messages, rounds))
+    report('process pool', await measure(pooled.analyze_sentiment_async, messages, rounds))
+    print(pooled.get_stats())
+    pooled.close()
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*args))
@@ -0,0 +1,81 @@
+"""
+Lookup latency and hit quality of the fuzzy translation memory with 1M
+stored entries. Near-duplicates are stored messages with the same meaning
+(case, spacing, stretched letters, one typo); every fuzzy hit on unseen
+messages is a false match, since those were never translated.
+
+    cd backend
+    python -m benchmarks.translation_memory [entries] [threshold]
+"""
+import itertools
+import random
+import resource
+import sys
+import time
+from app.services.translation_memory import TranslationMemory
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+def make_words(count: int, rng: random.Random):
+    return [''.join(rng.choice(LETTERS) for _ in range(rng.randint(2, 8))) for _ in range(count)]
+
+def make_message(words, weights, rng: random.Random) -> str:
+    # Zipf-like word frequencies, like real chat vocabulary
+    return ' '.join(rng.choices(words, cum_weights=weights, k=rng.randint(2, 6)))
+
+def perturb(text: str, rng: random.Random) -> str:
+    """Near-duplicate with the same meaning: case, spacing, a stretched letter or a typo"""
+    choice = rng.randint(0, 3)
+    if choice == 0:
+        return text.capitalize()
+    if choice == 1:
+        return '  ' + text.upper().replace(' ', ', ', 1)
+    i = rng.randrange(len(text))
+    if choice == 2:
+        return text[:i] + text[i] * 3 + text[i + 1:]
+    return text[:i] + rng.choice(LETTERS) + text[i + 1:]
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def main(entries: int = 1_000_000, threshold: float = 0.95, queries: int = 20000):
+    rng = random.Random(42)
+    words = make_words(50000, rng)
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    memory = TranslationMemory(threshold=threshold, max_entries=entries)
+
+    started = time.perf_counter()
+    stored = []
+    for i in range(entries):
+        text = make_message(words, weights, rng)
+        memory.add(text, 'en', 'hi', f"translation {i}")
+        if i % 50 == 0:
+            stored.append(text)
+    build_seconds = time.perf_counter() - started
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Indexed {entries} entries in {build_seconds:.1f}s, peak RSS {rss_mb:.0f} MB")
+
+    workloads = {
+        'near-duplicates': [perturb(rng.choice(stored), rng) for _ in range(queries)],
+        'unseen messages': [make_message(words, weights, rng) for _ in range(queries)],
+    }
+    print(f"threshold {threshold}")
+    for name, texts in workloads.items():
+        latencies = []
+        hits = 0
+        fuzzy_before = memory.stats['fuzzy_hits']
+        for text in texts:
+            t0 = time.perf_counter()
+            if memory.lookup(text, 'en', 'hi'):
+                hits += 1
+            latencies.append((time.perf_counter() - t0) * 1000)
+        fuzzy = memory.stats['fuzzy_hits'] - fuzzy_before
+        print(f"{name:<16} hit rate {hits / len(texts):6.1%} (fuzzy {fuzzy / len(texts):6.2%})   "
+              f"p50 {percentile(latencies, 0.5):.3f} ms   p99 {percentile(latencies, 0.99):.3f} ms")
+
+    print(memory.get_stats())
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 0.95)
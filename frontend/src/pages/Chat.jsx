@@ -12,7 +12,7 @@ export default function Chat() {
   const { conversationId } = useParams();
   const navigate = useNavigate();
   const { user } = useAuthStore();
-  const { messages, loadMessages, sendMessage, addMessage } = useChatStore();
+  const { messages, loadMessages, sendMessage, addMessage, patchMessage } = useChatStore();
   const { isDarkMode, toggleTheme } = useThemeStore();
   const [messageText, setMessageText] = useState('');
   const [isConnected, setIsConnected] = useState(false);
@@ -47,15 +47,28 @@ export default function Chat() {
         console.error('Error loading conversation:', error);
       }
 
-      loadMessages(conversationId);
+      loadMessages(conversationId, user.id);
 
+      // Delivered to this user's own room, so other conversations arrive here too
       socketService.onNewMessage((data) => {
+        if (data.conversation_id !== conversationId) {
+          return;
+        }
         addMessage(data);
         if (data.sender_id !== user.id) {
           socketService.markMessageRead(conversationId, data.id, user.id);
         }
       });
 
+      // Progressive delivery: translation and sentiment arrive after the original
+      socketService.onMessageTranslated(({ id, conversation_id, ...fields }) => {
+        patchMessage(id, fields);
+      });
+
+      socketService.onMessageSentiment(({ id, conversation_id, ...fields }) => {
+        patchMessage(id, fields);
+      });
+
       socketService.onUserTyping((data) => {
         if (data.user_id !== user.id) {
           setPartnerTyping(data.is_typing);
@@ -127,11 +140,11 @@ export default function Chat() {
       handleTyping(false);
 
       try {
+        // The server delivers the message to each participant in their own language
         const savedMessage = await sendMessage(messageData);
-        socketService.sendMessage({
-          ...savedMessage,
-          timestamp: savedMessage.timestamp || new Date().toISOString(),
-        });
+        if (!savedMessage) {
+          throw new Error('Message was not saved');
+        }
       } catch (error) {
         console.error('Error sending message:', error);
         setMessageText(messageData.text);
@@ -62,8 +62,10 @@ export const chatAPI = {
     return response.data;
   },
   
-  getMessages: async (conversationId) => {
-    const response = await api.get(`/chat/messages/${conversationId}`);
+  getMessages: async (conversationId, viewerId = null) => {
+    const response = await api.get(`/chat/messages/${conversationId}`, {
+      params: viewerId ? { viewer_id: viewerId } : {},
+    });
     return response.data;
   },
 };
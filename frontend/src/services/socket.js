@@ -123,6 +123,18 @@ class SocketService {
     }
   }
 
+  onMessageTranslated(callback) {
+    if (this.socket) {
+      this.socket.on('message_translated', callback);
+    }
+  }
+
+  onMessageSentiment(callback) {
+    if (this.socket) {
+      this.socket.on('message_sentiment', callback);
+    }
+  }
+
   onJoinedConversation(callback) {
     if (this.socket) {
       this.socket.on('joined_conversation', callback);
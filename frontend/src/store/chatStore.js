@@ -28,10 +28,10 @@ const useChatStore = create((set, get) => ({
     set({ currentConversation: conversation });
   },
 
-  loadMessages: async (conversationId) => {
+  loadMessages: async (conversationId, viewerId = null) => {
     set({ loading: true });
     try {
-      const messages = await chatAPI.getMessages(conversationId);
+      const messages = await chatAPI.getMessages(conversationId, viewerId);
       set({ messages, loading: false });
     } catch (error) {
       console.error('Error loading messages:', error);
@@ -60,6 +60,12 @@ const useChatStore = create((set, get) => ({
     });
   },
 
+  patchMessage: (messageId, fields) => {
+    set((state) => ({
+      messages: state.messages.map((m) => (m.id === messageId ? { ...m, ...fields } : m)),
+    }));
+  },
+
   sendMessage: async (messageData) => {
     try {
       const message = await chatAPI.sendMessage(messageData);